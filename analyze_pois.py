@@ -169,8 +169,8 @@ def analyze_pois(json_file):
         attrs = poi.get('attributes', {})
         categorized = False
         
-        # Add distance from center
-        if 'lat' in poi and 'lng' in poi:
+        # Add distance from center (newer dumps already carry it)
+        if 'distance_from_center' not in poi and 'lat' in poi and 'lng' in poi:
             poi['distance_from_center'] = calculate_distance(
                 center_lat, center_lng, poi['lat'], poi['lng']
             )
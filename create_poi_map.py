@@ -4,14 +4,18 @@ Create interactive HTML map visualization of POI data
 """
 
 import json
+import logging
 import sys
 from datetime import datetime
 
+logging.basicConfig(format='[%(asctime)s] %(message)s', datefmt='%H:%M:%S',
+                    level=logging.INFO, stream=sys.stdout)
+
 def create_poi_map(analysis_file):
     """
     Create interactive HTML map from POI analysis data
     """
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Creating POI map from {analysis_file}")
+    logging.info(f"Creating POI map from {analysis_file}")
     
     with open(analysis_file, 'r', encoding='utf-8') as f:
         data = json.load(f)
@@ -98,6 +102,10 @@ def create_poi_map(analysis_file):
             margin: 2px 0;
             font-size: 14px;
         }}
+        .center-marker {{
+            background: none;
+            border: none;
+        }}
     </style>
 </head>
 <body>
@@ -213,8 +221,9 @@ def create_poi_map(analysis_file):
         
         // Add center marker
         L.marker([""" + str(center_lat) + """, """ + str(center_lng) + """], {
-            icon: L.icon({
-                iconUrl: 'data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMjQiIGhlaWdodD0iMjQiIHZpZXdCb3g9IjAgMCAyNCAyNCIgZmlsbD0ibm9uZSIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPGNpcmNsZSBjeD0iMTIiIGN5PSIxMiIgcj0iOCIgZmlsbD0iIzAwMCIgc3Ryb2tlPSIjZmZmIiBzdHJva2Utd2lkdGg9IjIiLz4KPC9zdmc+',
+            icon: L.divIcon({
+                html: '<svg width="24" height="24" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg"><circle cx="12" cy="12" r="8" fill="#000" stroke="#fff" stroke-width="2"/></svg>',
+                className: 'center-marker',
                 iconSize: [24, 24],
                 iconAnchor: [12, 12]
             })
@@ -228,7 +237,7 @@ def create_poi_map(analysis_file):
     with open(map_filename, 'w', encoding='utf-8') as f:
         f.write(html_content)
     
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Interactive map saved to {map_filename}")
+    logging.info(f"Interactive map saved to {map_filename}")
     print(f"Open the file in your browser to view the map!")
     
     return map_filename
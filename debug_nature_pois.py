@@ -4,69 +4,87 @@ Debug script to investigate nature POIs and why they might not show on map
 """
 
 import json
+import os
+from collections import Counter
 
-def debug_nature_pois(enhanced_osm_file: str):
-    """Debug nature POIs to see what's wrong"""
-    
-    with open(enhanced_osm_file, 'r') as f:
-        osm_data = json.load(f)
-    
-    # Filter for nature POIs using same logic as routing engine
-    def categorize_poi(poi: dict) -> str:
-        attrs = poi.get('attributes', {})
-        if (attrs.get('natural') in ['tree', 'water', 'park'] or 
-            attrs.get('landuse') in ['forest', 'grass', 'garden'] or
-            attrs.get('leisure') in ['garden']):
-            return 'nature'
-        return 'other'
+# (tag, value) pairs that mark a POI as nature, same rules as the routing engine
+NATURE_KEYS = frozenset({
+    ('natural', 'tree'), ('natural', 'water'), ('natural', 'park'),
+    ('landuse', 'forest'), ('landuse', 'grass'), ('landuse', 'garden'),
+    ('leisure', 'garden'),
+})
+NATURE_TAGS = ('natural', 'landuse', 'leisure')
+
+def categorize_poi(poi: dict) -> str:
+    """Categorize a POI as 'nature' or 'other' via a single table lookup"""
+    attrs = poi.get('attributes', {})
+    if any((key, attrs.get(key)) in NATURE_KEYS for key in NATURE_TAGS):
+        return 'nature'
+    return 'other'
+
+def load_nature_partition(partition_dir: str):
+    """Load only the nature POIs from a partitioned dump directory"""
+    with open(os.path.join(partition_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
     
     nature_pois = []
-    for poi in osm_data.get('pois', []):
-        if categorize_poi(poi) == 'nature':
-            nature_pois.append(poi)
+    partition = manifest['partitions'].get('nature')
+    if partition:
+        with open(os.path.join(partition_dir, partition['file']), 'r', encoding='utf-8') as f:
+            nature_pois = [json.loads(line) for line in f if line.strip()]
+    
+    return nature_pois, manifest['metadata']
+
+def debug_nature_pois(enhanced_osm_file: str):
+    """
+    Debug nature POIs to see what's wrong. Accepts either a full enhanced OSM
+    dump or its '<dump>_pois' partition directory (reads only the nature file).
+    """
+    
+    if os.path.isdir(enhanced_osm_file):
+        nature_pois, metadata = load_nature_partition(enhanced_osm_file)
+    else:
+        with open(enhanced_osm_file, 'r') as f:
+            osm_data = json.load(f)
+        metadata = osm_data['metadata']
+        
+        # Filter for nature POIs using same logic as routing engine
+        nature_pois = []
+        for poi in osm_data.get('pois', []):
+            if categorize_poi(poi) == 'nature':
+                nature_pois.append(poi)
     
     print(f"Nature POIs: {len(nature_pois)}")
     print(f"\nFirst 10 nature POIs:")
     
-    valid_coords = 0
-    invalid_coords = 0
-    
     for i, poi in enumerate(nature_pois[:10]):
         print(f"\n{i+1}. OSM ID: {poi['osm_id']}")
         print(f"   Lat/Lng: {poi.get('lat', 'MISSING')}, {poi.get('lng', 'MISSING')}")
         print(f"   Attributes: {poi['attributes']}")
-        
-        if poi.get('lat') and poi.get('lng'):
-            valid_coords += 1
-        else:
-            invalid_coords += 1
     
-    # Check all nature POIs for coordinates
-    for poi in nature_pois:
-        if poi.get('lat') and poi.get('lng'):
-            valid_coords += 1
-        else:
-            invalid_coords += 1
+    # Check all nature POIs for coordinates (single pass, each POI counted once)
+    valid_coords = sum(1 for poi in nature_pois if poi.get('lat') and poi.get('lng'))
+    invalid_coords = len(nature_pois) - valid_coords
     
     print(f"\nCoordinate Summary:")
     print(f"Valid coordinates: {valid_coords}")
     print(f"Invalid coordinates: {invalid_coords}")
     
     # Check what types of nature features we have
-    nature_types = {}
+    nature_types = Counter()
     for poi in nature_pois:
         attrs = poi['attributes']
-        for key, value in attrs.items():
-            if key.startswith('natural') or key.startswith('landuse'):
-                nature_type = f"{key}={value}"
-                nature_types[nature_type] = nature_types.get(nature_type, 0) + 1
+        for key in ('natural', 'landuse'):
+            value = attrs.get(key)
+            if value is not None:
+                nature_types[f"{key}={value}"] += 1
     
     print(f"\nNature types breakdown:")
-    for nature_type, count in sorted(nature_types.items(), key=lambda x: x[1], reverse=True):
+    for nature_type, count in nature_types.most_common():
         print(f"  {nature_type}: {count}")
     
     # Create HTML map
-    create_nature_html_map(nature_pois, osm_data['metadata'])
+    create_nature_html_map(nature_pois, metadata)
 
 def create_nature_html_map(nature_pois, metadata):
     """Create HTML map of nature POIs"""
@@ -178,7 +196,7 @@ def create_nature_html_map(nature_pois, metadata):
 if __name__ == "__main__":
     import sys
     if len(sys.argv) < 2:
-        print("Usage: python debug_nature_pois.py <enhanced_osm_file.json>")
+        print("Usage: python debug_nature_pois.py <enhanced_osm_file.json | enhanced_osm_dump_*_pois/>")
         sys.exit(1)
     
     debug_nature_pois(sys.argv[1])
\ No newline at end of file
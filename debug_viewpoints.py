@@ -5,6 +5,25 @@ Debug viewpoints and peaks to see why they're not being selected
 
 import json
 
+# (tag, value) pairs that mark a POI as a viewpoint or a peak
+VIEWPOINT_KEYS = frozenset({('tourism', 'viewpoint')})
+PEAK_KEYS = frozenset({('natural', 'peak'), ('natural', 'summit')})
+
+def _is_viewpoint(attrs: dict) -> bool:
+    return (('tourism', attrs.get('tourism')) in VIEWPOINT_KEYS or
+            'viewpoint' in str(attrs.get('type', '')).lower())
+
+def _is_peak(attrs: dict) -> bool:
+    return (('natural', attrs.get('natural')) in PEAK_KEYS or
+            'peak' in str(attrs.get('type', '')).lower())
+
+def categorize_poi(poi: dict) -> str:
+    """Categorize a POI as 'viewpoints' or 'other'"""
+    attrs = poi.get('attributes', {})
+    if _is_viewpoint(attrs) or _is_peak(attrs):
+        return 'viewpoints'
+    return 'other'
+
 def debug_viewpoints(enhanced_osm_file: str):
     """Debug viewpoints and peaks"""
     print(f"Loading OSM data from {enhanced_osm_file}...")
@@ -25,13 +44,11 @@ def debug_viewpoints(enhanced_osm_file: str):
         attrs = poi.get('attributes', {})
         
         # Check for viewpoints
-        if (attrs.get('tourism') == 'viewpoint' or 
-            'viewpoint' in str(attrs.get('type', '')).lower()):
+        if _is_viewpoint(attrs):
             viewpoints.append(poi)
         
         # Check for peaks
-        if (attrs.get('natural') in ['peak', 'summit'] or
-            'peak' in str(attrs.get('type', '')).lower()):
+        if _is_peak(attrs):
             peaks.append(poi)
     
     print(f"\nFound {len(viewpoints)} viewpoints and {len(peaks)} peaks")
@@ -49,15 +66,6 @@ def debug_viewpoints(enhanced_osm_file: str):
         print(f"     Attributes: {peak['attributes']}")
     
     # Check what the categorization function would return
-    def categorize_poi(poi: dict) -> str:
-        attrs = poi.get('attributes', {})
-        if (attrs.get('tourism') == 'viewpoint' or 
-            attrs.get('natural') in ['peak', 'summit'] or
-            'viewpoint' in str(attrs.get('type', '')).lower() or
-            'peak' in str(attrs.get('type', '')).lower()):
-            return 'viewpoints'
-        return 'other'
-    
     print("\nCategorization check:")
     all_viewpoint_pois = viewpoints + peaks
     for poi in all_viewpoint_pois:
@@ -5,38 +5,239 @@ Enhanced OSM data dumper that fetches POIs, amenities, and interesting locations
 
 import osmnx as ox
 import json
+import logging
+import math
+import os
+import sys
+import numpy as np
+import shapely
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+from collections import Counter, defaultdict
 from datetime import datetime
 
+logging.basicConfig(format='[%(asctime)s] %(message)s', datefmt='%H:%M:%S',
+                    level=logging.INFO, stream=sys.stdout)
+
+EARTH_RADIUS_M = 6371000
+
+def haversine_m(lat, lng, lat0, lng0):
+    """
+    Vectorized haversine distance in meters from (lat0, lng0) to every point
+    in the lat/lng arrays
+    """
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lng = np.radians(np.asarray(lng, dtype=np.float64))
+    lat0 = np.radians(lat0)
+    lng0 = np.radians(lng0)
+    
+    a = (np.sin((lat - lat0) / 2) ** 2 +
+         np.cos(lat0) * np.cos(lat) * np.sin((lng - lng0) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+def _dumps(obj) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+def iter_nodes(G):
+    """Yield serializable network nodes one at a time"""
+    for node_id, node_attrs in G.nodes(data=True):
+        yield {
+            'node_id': node_id,
+            'lat': node_attrs['y'],
+            'lng': node_attrs['x'],
+            'attributes': {
+                key: str(value) if value is not None else None
+                for key, value in node_attrs.items() if key not in ('y', 'x')
+            }
+        }
+
+def iter_edges(G):
+    """Yield serializable network edges one at a time"""
+    for u, v, edge_attrs in G.edges(data=True):
+        edge_info = {
+            'from_node': u,
+            'to_node': v,
+            'attributes': {}
+        }
+        
+        for key, value in edge_attrs.items():
+            if hasattr(value, '__geo_interface__'):
+                edge_info['attributes'][key] = str(value)
+            elif isinstance(value, (list, dict)):
+                edge_info['attributes'][key] = str(value)
+            elif value is not None:
+                try:
+                    _dumps(value)
+                    edge_info['attributes'][key] = value
+                except (TypeError, ValueError):
+                    edge_info['attributes'][key] = str(value)
+            else:
+                edge_info['attributes'][key] = None
+        
+        yield edge_info
+
+def _write_json_array(f, items):
+    """Write an iterable as a JSON array, one element per line"""
+    f.write(b'[')
+    first = True
+    for item in items:
+        f.write(b'\n' if first else b',\n')
+        f.write(_dumps(item))
+        first = False
+    f.write(b'\n]')
+
+def write_enhanced_data(f, metadata, nodes, edges, pois):
+    """
+    Stream the enhanced dataset to a file opened in binary mode. The output is
+    the same single JSON document as before ({metadata, nodes, edges, pois}),
+    but nodes and edges are consumed lazily so no full list of them is ever held.
+    """
+    f.write(b'{\n"metadata": ')
+    f.write(_dumps(metadata))
+    f.write(b',\n"nodes": ')
+    _write_json_array(f, nodes)
+    f.write(b',\n"edges": ')
+    _write_json_array(f, edges)
+    f.write(b',\n"pois": ')
+    _write_json_array(f, pois)
+    f.write(b'\n}\n')
+
+def categorize_poi(poi: dict) -> str:
+    """Same categorization as in routing engine, used to partition the dump"""
+    attrs = poi.get('attributes', {})
+    
+    # Food categories
+    if attrs.get('amenity') == 'restaurant':
+        return 'restaurants'
+    elif attrs.get('amenity') == 'fast_food':
+        return 'fast_food'
+    elif attrs.get('amenity') == 'cafe':
+        return 'cafes'
+    elif attrs.get('amenity') in ['bar', 'pub']:
+        return 'bars_pubs'
+    
+    # Nature categories
+    elif (attrs.get('natural') in ['tree', 'water', 'park'] or 
+          attrs.get('landuse') in ['forest', 'grass', 'garden'] or
+          attrs.get('leisure') in ['garden']):
+        return 'nature'
+    
+    # Recreation & Sports
+    elif attrs.get('leisure') in ['park', 'playground', 'sports_centre', 'pitch']:
+        return 'recreation'
+    
+    # Shopping
+    elif attrs.get('shop'):
+        return 'shops'
+    
+    # Viewpoints
+    elif (attrs.get('tourism') == 'viewpoint' or 
+          attrs.get('natural') in ['peak', 'summit'] or
+          'viewpoint' in str(attrs.get('type', '')).lower() or
+          'peak' in str(attrs.get('type', '')).lower()):
+        return 'viewpoints'
+    
+    # Tourism & Culture
+    elif (attrs.get('tourism') in ['attraction', 'museum', 'gallery', 'monument'] or
+          attrs.get('historic') or
+          attrs.get('amenity') in ['theatre', 'cinema', 'arts_centre']):
+        return 'tourism'
+    
+    # Education
+    elif attrs.get('amenity') in ['school', 'university', 'college', 'library']:
+        return 'education'
+    
+    # Transportation
+    elif (attrs.get('amenity') in ['bicycle_parking', 'parking_space', 'bicycle_rental'] or
+          attrs.get('highway') in ['bus_stop'] or
+          attrs.get('public_transport')):
+        return 'transport'
+    
+    # Urban amenities (filtered out in routing but kept in the dump)
+    elif attrs.get('amenity') in ['bench', 'waste_basket', 'toilets', 'atm']:
+        return 'urban_amenities'
+    
+    # Default
+    return 'other'
+
+def write_poi_partitions(poi_data, partition_dir, metadata):
+    """
+    Write POIs as one NDJSON file per category (pois_<category>.ndjson) plus a
+    manifest.json, so consumers can load just the categories they need
+    """
+    by_category = defaultdict(list)
+    for poi in poi_data:
+        by_category[categorize_poi(poi)].append(poi)
+    
+    os.makedirs(partition_dir, exist_ok=True)
+    partitions = {}
+    for category, pois in sorted(by_category.items()):
+        partition_file = f"pois_{category}.ndjson"
+        with open(os.path.join(partition_dir, partition_file), 'wb') as f:
+            for poi in pois:
+                f.write(_dumps(poi))
+                f.write(b'\n')
+        partitions[category] = {'file': partition_file, 'count': len(pois)}
+    
+    manifest = {'metadata': metadata, 'partitions': partitions}
+    with open(os.path.join(partition_dir, 'manifest.json'), 'wb') as f:
+        f.write(_dumps(manifest))
+    
+    return partitions
+
 def fetch_comprehensive_osm_data(lat1, lng1, lat2, lng2, buffer_dist=2000):
     """
     Fetch comprehensive OSM data including POIs and amenities
     """
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Fetching comprehensive OSM data...")
+    logging.info("Fetching comprehensive OSM data...")
     
     center_lat = (lat1 + lat2) / 2
     center_lng = (lng1 + lng2) / 2
     
     # 1. Get walking network
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Fetching walking network...")
+    logging.info("Fetching walking network...")
     G = ox.graph_from_point((center_lat, center_lng), dist=buffer_dist, network_type='walk', simplify=True)
     
     # 2. Get POIs and amenities
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Fetching Points of Interest...")
+    logging.info("Fetching Points of Interest...")
     
-    # Define interesting POI tags
+    # Define interesting POI tags, narrowed to the union of the values the POI
+    # categorizers recognise: categorize_poi above, poi_routing_engine, analyze_pois,
+    # analyze_poi_categories, create_*_poi_map and the debug_* scripts
     useful_tags = {
-        'amenity': True,          # restaurants, cafes, shops, etc.
-        'leisure': True,          # parks, playgrounds, sports
-        'tourism': True,          # attractions, viewpoints, hotels
-        'historic': True,         # monuments, buildings
-        'natural': True,          # parks, water features, trees
-        'landuse': ['recreation_ground', 'forest', 'grass', 'meadow', 'orchard', 'vineyard'],
-        'shop': True,             # all types of shops
-        'craft': True,            # breweries, workshops
-        'office': True,           # offices, coworking spaces
+        'amenity': [
+            # food & drink
+            'restaurant', 'food_court', 'biergarten', 'fast_food', 'ice_cream',
+            'cafe', 'bar', 'pub', 'nightclub',
+            # culture
+            'theatre', 'cinema', 'arts_centre',
+            # education
+            'school', 'university', 'college', 'library', 'kindergarten',
+            # transport
+            'parking', 'bicycle_parking', 'parking_space', 'bicycle_rental',
+            # healthcare & services
+            'hospital', 'clinic', 'pharmacy', 'dentist', 'veterinary',
+            'bank', 'atm', 'post_office',
+            # urban amenities (categorized as urban_amenities, filtered out in routing)
+            'bench', 'waste_basket', 'toilets'
+        ],
+        'leisure': ['park', 'garden', 'playground', 'sports_centre', 'pitch',
+                    'fitness_centre', 'swimming_pool'],
+        'tourism': ['viewpoint', 'attraction', 'museum', 'gallery', 'monument',
+                    'hotel', 'hostel', 'guest_house'],
+        'historic': True,         # any historic feature counts as culture
+        'natural': ['tree', 'water', 'park', 'peak', 'summit'],
+        'landuse': ['recreation_ground', 'forest', 'grass', 'garden', 'meadow', 'orchard', 'vineyard'],
+        'shop': True,             # any shop is categorized as shopping
+        'office': ['government', 'lawyer'],
         'public_transport': True, # transit stops
-        'railway': True,          # train stations
-        'waterway': True,         # rivers, streams
+        'highway': ['bus_stop'],  # bus stops tagged without public_transport
+        'railway': ['station'],   # train stations
         'barrier': ['hedge', 'wall', 'fence'],  # landscape features
         'building': ['church', 'cathedral', 'mosque', 'synagogue', 'temple']  # religious buildings
     }
@@ -48,25 +249,30 @@ def fetch_comprehensive_osm_data(lat1, lng1, lat2, lng2, buffer_dist=2000):
             tags=useful_tags, 
             dist=buffer_dist
         )
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Found {len(pois)} POIs")
+        logging.info(f"Found {len(pois)} POIs")
+        
+        # Extract coordinates for all geometries at once: points as-is,
+        # everything else by centroid (NaN for missing/empty geometries)
+        geoms = np.asarray(pois.geometry.values)
+        geom_types = pois.geometry.geom_type.tolist()
+        is_point = shapely.get_type_id(geoms) == 0
+        reps = np.where(is_point, geoms, shapely.centroid(geoms))
+        lats = shapely.get_y(reps).tolist()
+        lngs = shapely.get_x(reps).tolist()
         
         # Convert POIs to serializable format
         poi_data = []
-        for idx, row in pois.iterrows():
+        for i, (idx, row) in enumerate(pois.iterrows()):
             poi_info = {
                 'osm_id': idx[1] if isinstance(idx, tuple) else idx,
                 'osm_type': idx[0] if isinstance(idx, tuple) else 'unknown',
-                'geometry_type': str(row.geometry.geom_type),
+                'geometry_type': str(geom_types[i]),
                 'attributes': {}
             }
             
-            # Extract coordinates
-            if row.geometry.geom_type == 'Point':
-                poi_info['lat'] = row.geometry.y
-                poi_info['lng'] = row.geometry.x
-            elif hasattr(row.geometry, 'centroid'):
-                poi_info['lat'] = row.geometry.centroid.y
-                poi_info['lng'] = row.geometry.centroid.x
+            if not math.isnan(lats[i]):
+                poi_info['lat'] = lats[i]
+                poi_info['lng'] = lngs[i]
             
             # Extract all non-geometric attributes
             for col, val in row.items():
@@ -77,95 +283,67 @@ def fetch_comprehensive_osm_data(lat1, lng1, lat2, lng2, buffer_dist=2000):
                         poi_info['attributes'][col] = val
             
             poi_data.append(poi_info)
+        
+        # Distance from center for every located POI in one vectorized call
+        located = [poi for poi in poi_data if 'lat' in poi]
+        if located:
+            distances = haversine_m([poi['lat'] for poi in located],
+                                    [poi['lng'] for poi in located],
+                                    center_lat, center_lng)
+            for poi, distance in zip(located, distances.tolist()):
+                poi['distance_from_center'] = distance
             
     except Exception as e:
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Error fetching POIs: {e}")
+        logging.error(f"Error fetching POIs: {e}")
         poi_data = []
     
-    # 3. Extract network data (same as before)
-    nodes_data = []
-    for node_id, node_attrs in G.nodes(data=True):
-        node_info = {
-            'node_id': node_id,
-            'lat': node_attrs['y'],
-            'lng': node_attrs['x'],
-            'attributes': {}
-        }
-        
-        for key, value in node_attrs.items():
-            if key not in ['y', 'x']:
-                node_info['attributes'][key] = str(value) if value is not None else None
-        
-        nodes_data.append(node_info)
+    # 3. Network data is streamed straight to disk by iter_nodes/iter_edges
+    total_nodes = G.number_of_nodes()
+    total_edges = G.number_of_edges()
     
-    edges_data = []
-    for u, v, edge_attrs in G.edges(data=True):
-        edge_info = {
-            'from_node': u,
-            'to_node': v,
-            'attributes': {}
-        }
-        
-        for key, value in edge_attrs.items():
-            if hasattr(value, '__geo_interface__'):
-                edge_info['attributes'][key] = str(value)
-            elif isinstance(value, (list, dict)):
-                edge_info['attributes'][key] = str(value)
-            elif value is not None:
-                try:
-                    json.dumps(value)
-                    edge_info['attributes'][key] = value
-                except (TypeError, ValueError):
-                    edge_info['attributes'][key] = str(value)
-            else:
-                edge_info['attributes'][key] = None
-        
-        edges_data.append(edge_info)
-    
-    # Compile enhanced dataset
-    enhanced_data = {
-        'metadata': {
-            'timestamp': datetime.now().isoformat(),
-            'bounding_box': {
-                'point1': {'lat': lat1, 'lng': lng1},
-                'point2': {'lat': lat2, 'lng': lng2},
-                'center': {'lat': center_lat, 'lng': center_lng}
-            },
-            'buffer_distance': buffer_dist,
-            'total_nodes': len(nodes_data),
-            'total_edges': len(edges_data),
-            'total_pois': len(poi_data)
+    metadata = {
+        'timestamp': datetime.now().isoformat(),
+        'bounding_box': {
+            'point1': {'lat': lat1, 'lng': lng1},
+            'point2': {'lat': lat2, 'lng': lng2},
+            'center': {'lat': center_lat, 'lng': center_lng}
         },
-        'nodes': nodes_data,
-        'edges': edges_data,
-        'pois': poi_data
+        'buffer_distance': buffer_dist,
+        'total_nodes': total_nodes,
+        'total_edges': total_edges,
+        'total_pois': len(poi_data)
     }
     
     # Save enhanced data
     filename = f"enhanced_osm_dump_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(enhanced_data, f, indent=2, ensure_ascii=False)
+    with open(filename, 'wb') as f:
+        write_enhanced_data(f, metadata, iter_nodes(G), iter_edges(G), poi_data)
+    
+    logging.info(f"Enhanced data saved to {filename}")
     
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Enhanced data saved to {filename}")
+    # Per-category POI partitions next to the full dump
+    partition_dir = filename[:-len('.json')] + '_pois'
+    partitions = write_poi_partitions(poi_data, partition_dir, metadata)
+    logging.info(f"POIs partitioned into {len(partitions)} categories in {partition_dir}/")
     print(f"Summary:")
-    print(f"  - Network nodes: {len(nodes_data)}")
-    print(f"  - Network edges: {len(edges_data)}")
+    print(f"  - Network nodes: {total_nodes}")
+    print(f"  - Network edges: {total_edges}")
     print(f"  - Points of Interest: {len(poi_data)}")
     
     # Show POI breakdown
     if poi_data:
-        poi_types = {}
+        poi_types = Counter()
         for poi in poi_data:
             attrs = poi['attributes']
             # Find the most relevant attribute
-            for key in ['amenity', 'leisure', 'tourism', 'shop', 'natural', 'historic']:
-                if key in attrs:
-                    poi_type = f"{key}={attrs[key]}"
-                    poi_types[poi_type] = poi_types.get(poi_type, 0) + 1
+            for key in ('amenity', 'leisure', 'tourism', 'shop', 'natural', 'historic'):
+                value = attrs.get(key)
+                if value is not None:
+                    poi_types[f"{key}={value}"] += 1
                     break
         
         print(f"\nTop POI types found:")
-        for poi_type, count in sorted(poi_types.items(), key=lambda x: x[1], reverse=True)[:10]:
+        for poi_type, count in poi_types.most_common(10):
             print(f"  {poi_type}: {count}")
     
     return filename
@@ -3,13 +3,86 @@ import osmnx as ox
 import networkx as nx
 import folium
 import folium.plugins
+import gzip
+import numpy as np
+import os
+import pickle
+import string
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from math import inf
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from shapely.geometry import LineString
 
-def fetch_graph(start, end, buffer_dist=5000):
+# OSM surface-taggar grupperade per yttyp
+PAVED_SURFACES = frozenset({'asphalt', 'concrete', 'paved', 'paving_stones'})
+UNPAVED_SURFACES = frozenset({'gravel', 'dirt', 'earth', 'unpaved'})
+GRASS_SURFACES = frozenset({'grass', 'ground'})
+SAND_SURFACES = frozenset({'sand'})
+SURFACE_TYPES = {
+    **{tag: 'paved' for tag in PAVED_SURFACES},
+    **{tag: 'unpaved' for tag in UNPAVED_SURFACES},
+    **{tag: 'grass' for tag in GRASS_SURFACES},
+    **{tag: 'sand' for tag in SAND_SURFACES},
+}
+
+# Vägtyper: namn, gånghastighet (km/h) och beskrivning, indexerade i samma ordning
+PATH_NAMES = ('sidewalk', 'footway', 'path', 'track', 'steps',
+              'pedestrian', 'cycleway', 'residential', 'service', 'other')
+PATH_SPEEDS = np.array([5.0, 4.5, 4.0, 3.5, 2.5, 4.8, 4.2, 4.8, 4.5, 4.0])
+PATH_DESCRIPTIONS = (
+    'Trottoarer och gångbanor', 'Dedikerade gångvägar', 'Naturliga stigar och vägar',
+    'Skogsstigar och jordvägar', 'Trappor och stegar', 'Gågator och torg',
+    'Cykelvägar (gång tillåten)', 'Bostadsgator', 'Servicevägar', 'Övriga vägar',
+)
+PATH_IDX = {name: i for i, name in enumerate(PATH_NAMES)}
+
+# Yttyper: namn, hastighetsfaktor och beskrivning
+SURFACE_NAMES = ('paved', 'unpaved', 'grass', 'sand', 'unknown')
+SURFACE_SPEED_MODIFIERS = np.array([1.0, 0.8, 0.7, 0.6, 0.9])
+SURFACE_DESCRIPTIONS = ('Asfalt/betong', 'Grus/jord', 'Gräs', 'Sand', 'Okänd yta')
+SURFACE_IDX = {name: i for i, name in enumerate(SURFACE_NAMES)}
+
+# Speciella områden (historic detekteras inte ur kanttaggarna och blir alltid 0)
+SPECIAL_AREA_NAMES = ('park', 'forest', 'waterfront', 'historic', 'viewpoint', 'attraction')
+SPECIAL_AREA_DESCRIPTIONS = (
+    'Parker och grönområden', 'Skog och naturområden', 'Strandpromenader',
+    'Historiska områden', 'Utsiktspunkter', 'Turistattraktioner',
+)
+
+# Kanttaggar som OSMnx kan ge som listor när förenklade kanter slås ihop
+LIST_VALUED_TAGS = ('highway', 'surface', 'name', 'leisure', 'tourism', 'natural', 'waterway')
+
+# De enda kantattribut som routing och statistik läser
+EDGE_ATTRIBUTES = frozenset(('length',) + LIST_VALUED_TAGS)
+
+def normalize_edge_tags(G):
+    """
+    Ersätter listvärda taggar med första värdet (None för tom lista) en gång
+    vid inläsning, så att resten av koden kan läsa dem som vanliga strängar.
+    Övriga attribut (osmid, geometry, oneway, lanes, ...) tas bort i samma
+    pass, vilket ger mindre kantdictar och en mindre grafcache.
+    """
+    for u, v, k, data in G.edges(keys=True, data=True):
+        for key in [key for key in data if key not in EDGE_ATTRIBUTES]:
+            del data[key]
+        for tag in LIST_VALUED_TAGS:
+            value = data.get(tag)
+            if isinstance(value, list):
+                data[tag] = value[0] if value else None
+
+# Lokal diskcache för hämtade gångnätverk
+GRAPH_CACHE_DIR = '.graph_cache'
+
+def fetch_graph(start, end, buffer_dist=5000, use_cache=True):
     """
     Hämta ett gångnätverk (foot-paths) kring mittpunkten mellan start och end.
     buffer_dist är radien i meter.
+    Grafen cachas på disk (pickle) per avrundad mittpunkt och buffer_dist,
+    så upprepade körningar slipper Overpass-anropet. Listvärda kanttaggar
+    normaliseras och oanvända kantattribut tas bort innan grafen cachas.
     """
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Fetching walking network...")
     start_time = time.time()
@@ -17,7 +90,21 @@ def fetch_graph(start, end, buffer_dist=5000):
     mid = ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Center point: {mid[0]:.4f}, {mid[1]:.4f}")
     
+    cache_file = os.path.join(GRAPH_CACHE_DIR, f"walk_{mid[0]:.3f}_{mid[1]:.3f}_{buffer_dist}.pkl")
+    if use_cache and os.path.exists(cache_file):
+        with open(cache_file, 'rb') as f:
+            G = pickle.load(f)
+        elapsed = time.time() - start_time
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Graph loaded from cache in {elapsed:.2f}s - {len(G.nodes)} nodes, {len(G.edges)} edges")
+        return G
+    
     G = ox.graph_from_point(mid, dist=buffer_dist, network_type='walk', simplify=True)
+    normalize_edge_tags(G)
+    
+    if use_cache:
+        os.makedirs(GRAPH_CACHE_DIR, exist_ok=True)
+        with open(cache_file, 'wb') as f:
+            pickle.dump(G, f, protocol=5)
     
     elapsed = time.time() - start_time
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Graph fetched in {elapsed:.2f}s - {len(G.nodes)} nodes, {len(G.edges)} edges")
@@ -27,37 +114,184 @@ def annotate_fun_weights(G):
     """
     Sätter attribuet fun_weight = length / fun_score för varje kant.
     Höjer poängen för trails, parker och utsiktspunkter.
+    Sätter även balanced_weight = 0.7 * length + 0.3 * fun_weight.
+    Beräknas vektoriserat med NumPy och bara en gång per graf.
     """
+    if G.graph.get('fun_weights_annotated'):
+        return
+    
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Calculating fun weights...")
     start_time = time.time()
     
-    fun_highways = {'footway','path','pedestrian','track','steps','cycleway'}
+    fun_highways = ['footway','path','pedestrian','track','steps','cycleway']
     path_penalty_factor = 3.0  # Heavily penalize generic 'path' ways
-    fun_edges = 0
-    park_edges = 0
-    attraction_edges = 0
     
+    # Ett pass över kanterna för att plocka ut attributkolumner
+    edge_keys = []
+    highway, leisure, tourism, lengths = [], [], [], []
     for u, v, k, data in G.edges(keys=True, data=True):
-        hw = data.get('highway')
-        if isinstance(hw, list): hw = hw[0]
-        score = 1.0
-        if hw in fun_highways:        
-            score += 2.0
-            fun_edges += 1
-        if data.get('leisure')=='park':      
-            score += 1.5
-            park_edges += 1
-        if data.get('tourism') in ('viewpoint','attraction'):
-            score += 3.0
-            attraction_edges += 1
-        weight = data['length'] / score
-        if hw == 'path':
-            weight *= path_penalty_factor
-        data['fun_weight'] = weight
+        edge_keys.append((u, v, k))
+        highway.append(data.get('highway') or '')
+        leisure.append(data.get('leisure') or '')
+        tourism.append(data.get('tourism') or '')
+        lengths.append(data['length'])
+    
+    highway = np.array(highway, dtype=str)
+    lengths = np.array(lengths, dtype=np.float64)
+    m_fun = np.isin(highway, fun_highways)
+    m_park = np.array(leisure, dtype=str) == 'park'
+    m_attr = np.isin(np.array(tourism, dtype=str), ['viewpoint', 'attraction'])
+    
+    score = 1.0 + 2.0 * m_fun + 1.5 * m_park + 3.0 * m_attr
+    fun_weight = lengths / score
+    fun_weight[highway == 'path'] *= path_penalty_factor
+    
+    # Balanserad vikt (kombination av längd och fun) i samma pass
+    balanced_weight = (lengths * 0.7) + (fun_weight * 0.3)
+    
+    nx.set_edge_attributes(G, dict(zip(edge_keys, fun_weight.tolist())), 'fun_weight')
+    nx.set_edge_attributes(G, dict(zip(edge_keys, balanced_weight.tolist())), 'balanced_weight')
+    G.graph['fun_weights_annotated'] = True
     
     elapsed = time.time() - start_time
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Fun weights calculated in {elapsed:.2f}s")
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Found {fun_edges} fun paths, {park_edges} park edges, {attraction_edges} attractions")
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Found {int(m_fun.sum())} fun paths, {int(m_park.sum())} park edges, {int(m_attr.sum())} attractions")
+
+def graph_to_csr(G, weight_attrs):
+    """
+    Bygger en CSR-adjacens av G i ett enda pass över kanterna.
+    Returnerar (nodes, node_to_idx, matrices) där matrices har en csr_matrix
+    per viktattribut. Topologin är densamma för alla vikter; parallella kanter
+    reduceras till den lättaste, precis som nx.shortest_path gör.
+    """
+    nodes = list(G.nodes)
+    node_to_idx = {n: i for i, n in enumerate(nodes)}
+    n_nodes = len(nodes)
+    n_edges = G.number_of_edges()
+    
+    rows = np.empty(n_edges, dtype=np.int32)
+    cols = np.empty(n_edges, dtype=np.int32)
+    weights = {attr: np.empty(n_edges, dtype=np.float64) for attr in weight_attrs}
+    
+    for i, (u, v, data) in enumerate(G.edges(data=True)):
+        rows[i] = node_to_idx[u]
+        cols[i] = node_to_idx[v]
+        length = data.get('length', 0)
+        for attr, values in weights.items():
+            values[i] = data.get(attr, length)
+    
+    matrices = {}
+    for attr, values in weights.items():
+        # Sortera på (rad, kolumn, vikt) och behåll första kanten per (u, v)
+        order = np.lexsort((values, cols, rows))
+        r, c, w = rows[order], cols[order], values[order]
+        keep = np.ones(len(r), dtype=bool)
+        keep[1:] = (r[1:] != r[:-1]) | (c[1:] != c[:-1])
+        r, c, w = r[keep], c[keep], w[keep]
+        
+        indptr = np.zeros(n_nodes + 1, dtype=np.int32)
+        np.cumsum(np.bincount(r, minlength=n_nodes), out=indptr[1:])
+        matrices[attr] = csr_matrix((w, c, indptr), shape=(n_nodes, n_nodes))
+    
+    return nodes, node_to_idx, matrices
+
+# Viktattribut som routingen använder (en CSR-matris per attribut)
+ROUTE_WEIGHTS = ('length', 'fun_weight', 'balanced_weight')
+
+# Lägsta möjliga kostnad per meter fågelväg för varje vikt. fun_score är som
+# mest 1 + 2 + 1.5 + 3 = 7.5, så fun_weight >= length / 7.5 och
+# balanced_weight >= 0.7 * length + 0.3 * length / 7.5.
+MIN_COST_PER_METER = {
+    'length': 1.0,
+    'fun_weight': 1 / 7.5,
+    'balanced_weight': 0.7 + 0.3 / 7.5,
+}
+
+EARTH_RADIUS_M = 6371000
+
+def haversine_m(lat, lng, lat0, lng0):
+    """
+    Vektoriserat fågelvägsavstånd i meter från (lat0, lng0) till varje punkt
+    i lat/lng-arrayerna.
+    """
+    lat, lng = np.radians(lat), np.radians(lng)
+    lat0, lng0 = np.radians(lat0), np.radians(lng0)
+    a = (np.sin((lat - lat0) / 2) ** 2
+         + np.cos(lat) * np.cos(lat0) * np.sin((lng - lng0) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+def routing_graph(G):
+    """
+    Returnerar routing-strukturen (nodes, node_to_idx, matrices) för G.
+    NetworkX-grafen används bara för inläsning och statistik; all routing går
+    mot CSR-matriserna, som byggs en gång per graf och sparas i G.graph.
+    """
+    cached = G.graph.get('routing_csr')
+    if cached is None:
+        annotate_fun_weights(G)
+        cached = graph_to_csr(G, ROUTE_WEIGHTS)
+        G.graph['routing_csr'] = cached
+    return cached
+
+def node_coordinates(G):
+    """
+    Returnerar (node_to_idx, coords) där coords är en (N, 2)-array med
+    [lat, lon] per nod, i samma radordning som routing-grafens CSR-matriser.
+    Byggs en gång per graf och sparas i G.graph.
+    """
+    cached = G.graph.get('node_coords')
+    if cached is None:
+        nodes, node_to_idx, _ = routing_graph(G)
+        node_data = G.nodes
+        coords = np.array([(node_data[n]['y'], node_data[n]['x']) for n in nodes],
+                          dtype=np.float64).reshape(-1, 2)
+        cached = (node_to_idx, coords)
+        G.graph['node_coords'] = cached
+    return cached
+
+def goal_directed_nodes(G, orig_idx, dest_idx, min_cost_per_meter, limit):
+    """
+    Målriktad beskärning (samma undre gräns som en A*-heuristik): en väg via
+    nod x kostar minst min_cost_per_meter * (fågelväg(orig, x) + fågelväg(x, dest)).
+    Returnerar index för noderna där den gränsen ryms inom limit, dvs en
+    ellips kring start och mål.
+    """
+    _, coords = node_coordinates(G)
+    lat, lng = coords[:, 0], coords[:, 1]
+    via = (haversine_m(lat, lng, *coords[orig_idx])
+           + haversine_m(lat, lng, *coords[dest_idx]))
+    return np.flatnonzero(via * min_cost_per_meter <= limit * (1 + 1e-9))
+
+def shortest_path_csr(matrix, nodes, orig_idx, dest_idx, limit=inf, keep=None):
+    """
+    Dijkstra från orig_idx på CSR-matrisen. Returnerar rutten som en lista
+    av nod-id:n i G, eller kastar nx.NetworkXNoPath om dest inte nås.
+    limit är en övre gräns för ruttens kostnad (t.ex. kostnaden för en redan
+    känd väg); noder längre bort än så utforskas inte.
+    keep är ett valfritt sorterat urval av nodindex (se goal_directed_nodes);
+    sökningen körs då bara på delgrafen mellan de noderna.
+    """
+    orig, dest = nodes[orig_idx], nodes[dest_idx]
+    if keep is not None:
+        matrix = matrix[keep][:, keep]
+        orig_idx, dest_idx = np.searchsorted(keep, (orig_idx, dest_idx))
+    
+    dist, predecessors = dijkstra(matrix, directed=True, indices=orig_idx,
+                                  return_predecessors=True, limit=limit * (1 + 1e-9))
+    if not np.isfinite(dist[dest_idx]):
+        raise nx.NetworkXNoPath(f"No path between {orig} and {dest}")
+    
+    path = [dest_idx]
+    while path[-1] != orig_idx:
+        path.append(int(predecessors[path[-1]]))
+    if keep is not None:
+        path = keep[path].tolist()
+    return [nodes[i] for i in reversed(path)]
+
+def path_cost(matrix, node_to_idx, route):
+    """Kostnaden för en given rutt (lista av nod-id:n) under CSR-matrisens vikter"""
+    idx = [node_to_idx[n] for n in route]
+    return float(np.asarray(matrix[idx[:-1], idx[1:]]).sum())
 
 def compute_fun_route(start, end, buffer_dist=5000):
     """
@@ -67,15 +301,14 @@ def compute_fun_route(start, end, buffer_dist=5000):
     total_start = time.time()
     
     G = fetch_graph(start, end, buffer_dist)
-    annotate_fun_weights(G)
+    nodes, node_to_idx, matrices = routing_graph(G)
     
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Finding nearest nodes...")
-    orig = ox.distance.nearest_nodes(G, X=start[1], Y=start[0])
-    dest = ox.distance.nearest_nodes(G, X=end[1], Y=end[0])
+    orig, dest = ox.distance.nearest_nodes(G, X=[start[1], end[1]], Y=[start[0], end[0]])
     
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Computing shortest fun path...")
     route_start = time.time()
-    route = nx.shortest_path(G, orig, dest, weight='fun_weight')
+    route = shortest_path_csr(matrices['fun_weight'], nodes, node_to_idx[orig], node_to_idx[dest])
     route_time = time.time() - route_start
     
     total_time = time.time() - total_start
@@ -84,37 +317,17 @@ def compute_fun_route(start, end, buffer_dist=5000):
     
     return route, G
 
-def create_multi_route_map(G, routes, start, end):
-    """
-    Skapar en interaktiv karta med flera rutter på OpenStreetMap.
-    """
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Creating multi-route interactive map...")
-    
-    # Skapa karta centrerad på mittpunkten
-    center_lat = (start[0] + end[0]) / 2
-    center_lon = (start[1] + end[1]) / 2
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=14)
-    
-    # Bygg info-panel med alla rutter
-    routes_info = ""
-    for i, route_data in enumerate(routes):
-        stats = route_data['stats']
-        
-        # Räkna trail segments (path + track + footway)
-        trail_time = (stats['path_types']['path']['time'] + 
-                     stats['path_types']['track']['time'] + 
-                     stats['path_types']['footway']['time'])
-        
-        # Räkna park tid
-        park_time = stats['special_areas']['park']['time']
-        
-        routes_info += f"""
-        │ <span style="color: {route_data['color']};">■</span> <span style="color: #ffff00;">{route_data['name']}</span><br>
-        │   TIME: {stats['estimated_time']:.0f}min | DIST: {stats['distance']/1000:.2f}km<br>
-        │   FUN: <span style="color: #ff6600;">{stats['fun_score']:.2f}</span> | TRAILS: {trail_time:.0f}min | PARKS: {park_time:.0f}min<br>
-        │<br>"""
-    
-    info_html = f"""
+# Tolerans i grader för förenkling av ritade rutter (~1 m på svenska breddgrader)
+POLYLINE_SIMPLIFY_TOLERANCE = 1e-5
+
+# HTML-mallar för kartans info-panel och rutt-popups
+ROUTE_INFO_TEMPLATE = string.Template("""
+        │ <span style="color: $color;">■</span> <span style="color: #ffff00;">$name</span><br>
+        │   TIME: ${time}min | DIST: ${distance_km}km<br>
+        │   FUN: <span style="color: #ff6600;">$fun_score</span> | TRAILS: ${trail_time}min | PARKS: ${park_time}min<br>
+        │<br>""")
+
+INFO_PANEL_TEMPLATE = string.Template("""
     <div style="position: fixed; 
                 top: 10px; left: 10px; width: 400px; height: auto;
                 background-color: #1e1e1e; color: #00ff00; 
@@ -125,12 +338,12 @@ def create_multi_route_map(G, routes, start, end):
         ┌─[ MULTI-ROUTE COMPARISON ]──────────────────┐
         </div>
         <div style="margin-left: 5px;">
-        │ <span style="color: #00ffff;">ROUTES COMPUTED:</span> {len(routes)}<br>
+        │ <span style="color: #00ffff;">ROUTES COMPUTED:</span> $route_count<br>
         │ <span style="color: #00ffff;">COORDS:</span><br>
-        │   START: <span style="color: #90ee90;">{start[0]:.6f}, {start[1]:.6f}</span><br>
-        │   END:   <span style="color: #ff6b6b;">{end[0]:.6f}, {end[1]:.6f}</span><br>
+        │   START: <span style="color: #90ee90;">$start_coords</span><br>
+        │   END:   <span style="color: #ff6b6b;">$end_coords</span><br>
         │<br>
-        {routes_info}
+        $routes_info
         │ <span style="color: #ffff00;">CONTROLS:</span><br>
         │ <span style="color: #888;">Click routes for details</span><br>
         │ <span style="color: #888;">Zoom: Mouse wheel</span><br>
@@ -140,18 +353,83 @@ def create_multi_route_map(G, routes, start, end):
         └─────────────────────────────────────────────┘
         </div>
     </div>
+    """)
+
+ROUTE_POPUP_TEMPLATE = string.Template("""
+        <div style="font-family: 'Courier New', monospace; background: #1e1e1e; color: #00ff00; padding: 8px; border-radius: 3px; max-width: 300px;">
+        <b style="color: #ffff00;">[$name ROUTE]</b><br>
+        <span style="color: #888;">$description</span><br><br>
+        DISTANCE: ${distance}m (${distance_km}km)<br>
+        TIME EST: <span style="color: #00ffff;">$time minutes</span><br>
+        AVG SPEED: $avg_speed km/h<br>
+        FUN SCORE: <span style="color: #ff6600;">$fun_score</span><br><br>
+        <b style="color: #ffff00;">MAIN PATH TYPE:</b><br>
+        $main_path: ${main_path_time}min (${main_path_distance}m)<br>
+        <span style="color: #888;">$main_path_description</span><br><br>
+        <b style="color: #ffff00;">SURFACE:</b><br>
+        $main_surface: ${main_surface_time}min<br>
+        <span style="color: #888;">$main_surface_description</span><br><br>
+        <b style="color: #ffff00;">SPECIAL AREAS:</b><br>
+        $special_areas
+        </div>
+        """)
+
+def create_multi_route_map(G, routes, start, end, compress=False, verbose=True):
+    """
+    Skapar en interaktiv karta med flera rutter på OpenStreetMap.
+    Med compress=True sparas kartan gzip-komprimerad (.html.gz) för att
+    serveras med Content-Encoding: gzip; okomprimerad HTML behövs för file://.
+    Med verbose=False hoppas MeasureControl och popups över (rutter och
+    markörer får bara en tooltip), för mindre HTML vid stora batcher.
     """
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Creating multi-route interactive map...")
+    
+    # Skapa karta centrerad på mittpunkten
+    center_lat = (start[0] + end[0]) / 2
+    center_lon = (start[1] + end[1]) / 2
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=14, prefer_canvas=True)
+    
+    # Bygg info-panel med alla rutter
+    route_lines = []
+    for route_data in routes:
+        stats = route_data['stats']
+        
+        # Räkna trail segments (path + track + footway)
+        trail_time = (stats['path_types']['path']['time'] + 
+                     stats['path_types']['track']['time'] + 
+                     stats['path_types']['footway']['time'])
+        
+        # Räkna park tid
+        park_time = stats['special_areas']['park']['time']
+        
+        route_lines.append(ROUTE_INFO_TEMPLATE.substitute(
+            color=route_data['color'],
+            name=route_data['name'],
+            time=f"{stats['estimated_time']:.0f}",
+            distance_km=f"{stats['distance']/1000:.2f}",
+            fun_score=f"{stats['fun_score']:.2f}",
+            trail_time=f"{trail_time:.0f}",
+            park_time=f"{park_time:.0f}",
+        ))
+    
+    info_html = INFO_PANEL_TEMPLATE.substitute(
+        route_count=len(routes),
+        start_coords=f"{start[0]:.6f}, {start[1]:.6f}",
+        end_coords=f"{end[0]:.6f}, {end[1]:.6f}",
+        routes_info="".join(route_lines),
+    )
     
     # Lägg till info-panelen
     m.get_root().html.add_child(folium.Element(info_html))
     
     # Lägg till scale control
-    folium.plugins.MeasureControl(
-        primary_length_unit='meters',
-        secondary_length_unit='kilometers',
-        primary_area_unit='sqmeters',
-        secondary_area_unit='hectares'
-    ).add_to(m)
+    if verbose:
+        folium.plugins.MeasureControl(
+            primary_length_unit='meters',
+            secondary_length_unit='kilometers',
+            primary_area_unit='sqmeters',
+            secondary_area_unit='hectares'
+        ).add_to(m)
     
     # Lägg till start- och slutpunkter
     start_popup = f"""
@@ -174,50 +452,55 @@ def create_multi_route_map(G, routes, start, end):
     
     folium.Marker(
         location=[start[0], start[1]], 
-        popup=folium.Popup(start_popup, max_width=200),
+        popup=folium.Popup(start_popup, max_width=200) if verbose else None,
+        tooltip=None if verbose else 'START',
         icon=folium.Icon(color='green', icon='play')
     ).add_to(m)
     
     folium.Marker(
         location=[end[0], end[1]], 
-        popup=folium.Popup(end_popup, max_width=200),
+        popup=folium.Popup(end_popup, max_width=200) if verbose else None,
+        tooltip=None if verbose else 'DESTINATION',
         icon=folium.Icon(color='red', icon='stop')
     ).add_to(m)
     
     # Rita alla rutter
+    node_to_idx, node_coords = node_coordinates(G)
     all_coords = []
     for route_data in routes:
-        coords = [(G.nodes[n]['y'], G.nodes[n]['x']) for n in route_data['route']]
+        rows = np.fromiter((node_to_idx[n] for n in route_data['route']),
+                           dtype=np.intp, count=len(route_data['route']))
+        coords = node_coords[rows].tolist()
         all_coords.append(coords)
-        stats = route_data['stats']
-        
-        # Hitta huvudsakliga vägtyper och ytor
-        main_path = max(stats['path_types'].items(), 
-                       key=lambda x: x[1]['distance'] if x[1]['distance'] > 0 else 0)
-        main_surface = max(stats['surface_types'].items(), 
-                          key=lambda x: x[1]['distance'] if x[1]['distance'] > 0 else 0)
-        
-        # Räkna speciella områden
-        special_areas_list = [k for k, v in stats['special_areas'].items() if v['distance'] > 0]
-        
-        route_popup = f"""
-        <div style="font-family: 'Courier New', monospace; background: #1e1e1e; color: #00ff00; padding: 8px; border-radius: 3px; max-width: 300px;">
-        <b style="color: #ffff00;">[{route_data['name']} ROUTE]</b><br>
-        <span style="color: #888;">{route_data['description']}</span><br><br>
-        DISTANCE: {stats['distance']:.0f}m ({stats['distance']/1000:.2f}km)<br>
-        TIME EST: <span style="color: #00ffff;">{stats['estimated_time']:.0f} minutes</span><br>
-        AVG SPEED: {stats['avg_speed']:.1f} km/h<br>
-        FUN SCORE: <span style="color: #ff6600;">{stats['fun_score']:.2f}</span><br><br>
-        <b style="color: #ffff00;">MAIN PATH TYPE:</b><br>
-        {main_path[0].upper()}: {main_path[1]['time']:.0f}min ({main_path[1]['distance']:.0f}m)<br>
-        <span style="color: #888;">{main_path[1]['description']}</span><br><br>
-        <b style="color: #ffff00;">SURFACE:</b><br>
-        {main_surface[0].upper()}: {main_surface[1]['time']:.0f}min<br>
-        <span style="color: #888;">{main_surface[1]['description']}</span><br><br>
-        <b style="color: #ffff00;">SPECIAL AREAS:</b><br>
-        {', '.join(special_areas_list) if special_areas_list else 'None detected'}
-        </div>
-        """
+        # Popup med ruttdetaljer (bara i verbose-läge)
+        route_popup = None
+        if verbose:
+            stats = route_data['stats']
+            
+            # Hitta huvudsakliga vägtyper och ytor
+            main_path = (stats['active_paths'] or list(stats['path_types'].items()))[0]
+            main_surface = (stats['active_surfaces'] or list(stats['surface_types'].items()))[0]
+            
+            # Speciella områden längs rutten
+            special_areas_list = [k for k, v in stats['active_areas']]
+            
+            route_popup = ROUTE_POPUP_TEMPLATE.substitute(
+                name=route_data['name'],
+                description=route_data['description'],
+                distance=f"{stats['distance']:.0f}",
+                distance_km=f"{stats['distance']/1000:.2f}",
+                time=f"{stats['estimated_time']:.0f}",
+                avg_speed=f"{stats['avg_speed']:.1f}",
+                fun_score=f"{stats['fun_score']:.2f}",
+                main_path=main_path[0].upper(),
+                main_path_time=f"{main_path[1]['time']:.0f}",
+                main_path_distance=f"{main_path[1]['distance']:.0f}",
+                main_path_description=main_path[1]['description'],
+                main_surface=main_surface[0].upper(),
+                main_surface_time=f"{main_surface[1]['time']:.0f}",
+                main_surface_description=main_surface[1]['description'],
+                special_areas=', '.join(special_areas_list) if special_areas_list else 'None detected',
+            )
         
         # Olika linjestilar för olika rutter
         if route_data['name'] == 'SHORTEST':
@@ -230,152 +513,155 @@ def create_multi_route_map(G, routes, start, end):
             dash_array = '15,10,5,10'
             weight = 4
         
+        # Förenkla linjen (Douglas-Peucker) innan den skrivs in i HTML:en
+        if len(coords) > 2:
+            simplified = LineString(coords).simplify(POLYLINE_SIMPLIFY_TOLERANCE, preserve_topology=False)
+            line_coords = [list(c) for c in simplified.coords]
+        else:
+            line_coords = coords
+        
         folium.PolyLine(
-            locations=coords,
+            locations=line_coords,
             color=route_data['color'],
             weight=weight,
             opacity=0.8,
             dash_array=dash_array,
-            popup=folium.Popup(route_popup, max_width=300)
+            popup=route_popup,
+            tooltip=None if verbose else route_data['name']
         ).add_to(m)
     
     # Spara kartan
     map_file = 'multi_route_map.html'
-    m.save(map_file)
+    if compress:
+        map_file += '.gz'
+        with gzip.open(map_file, 'wt', encoding='utf-8', compresslevel=6) as f:
+            f.write(m.get_root().render())
+    else:
+        m.save(map_file)
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Multi-route map saved as {map_file}")
     
     return all_coords, map_file
 
-def calculate_detailed_route_stats(G, route):
+def active_categories(categories):
     """
-    Beräknar mycket detaljerad statistik för rutten med tidsuppdelning.
+    Returnerar (namn, data)-par med distance > 0, sorterade efter distans
+    (längst först), så att visningsfunktionerna slipper filtrera om.
+    """
+    active = [(k, v) for k, v in categories.items() if v['distance'] > 0]
+    active.sort(key=lambda x: x[1]['distance'], reverse=True)
+    return active
+
+def route_segment(segments, j):
     """
-    # Grundläggande statistik
-    total_distance = 0
-    total_fun_weight = 0
+    Bygger en segmentdict (length, time, path_type, surface_type, speed,
+    features, name) ur segmentkolumnerna, bara för de segment som visas.
+    """
+    return {
+        'length': segments['length'][j].item(),
+        'time': segments['time'][j].item(),
+        'path_type': PATH_NAMES[segments['path_id'][j]],
+        'surface_type': SURFACE_NAMES[segments['surface_id'][j]],
+        'speed': segments['speed'][j].item(),
+        'features': [SPECIAL_AREA_NAMES[a] for a in np.flatnonzero(segments['area_mask'][j])],
+        'name': segments['name'][j]
+    }
+
+def accumulate_categories(lengths, times, path_ids, surface_ids, area_mask):
+    """
+    Summerar distans och tid per vägtyp, yta och speciellt område ur
+    segmentkolumnerna. Returnerar tre (2, K)-arrayer med rad 0 = distans och
+    rad 1 = tid, i PATH_NAMES-, SURFACE_NAMES- resp. SPECIAL_AREA_NAMES-ordning.
+    """
+    columns = np.vstack((lengths, times))
+    path_sums = np.vstack([np.bincount(path_ids, weights=c, minlength=len(PATH_NAMES))
+                           for c in columns])
+    surface_sums = np.vstack([np.bincount(surface_ids, weights=c, minlength=len(SURFACE_NAMES))
+                              for c in columns])
+    area_sums = columns @ area_mask
+    return path_sums, surface_sums, area_sums
+
+def _route_stats(G, route, detail):
+    """
+    Gemensam implementation för route_summary_stats och route_detail_stats.
+    Med detail=False hoppas segmentnamn och segmentkolumner över.
+    """
+    # Förallokerade segmentkolumner (SoA), fylls i ett enda pass över rutten.
+    # Kanten plockas direkt ur adjacensen (kortaste parallella kant).
+    adj = G._adj
+    size = max(len(route) - 1, 0)
+    lengths = np.empty(size)
+    fun_weights = np.empty(size)
+    path_ids = np.empty(size, dtype=np.int8)
+    surface_ids = np.empty(size, dtype=np.int8)
+    # Speciella områden som en (segment x område) boolmatris
+    # (kolumner i SPECIAL_AREA_NAMES-ordning)
+    area_mask = np.zeros((size, len(SPECIAL_AREA_NAMES)), dtype=bool)
+    names = [None] * size if detail else None
+    
+    n = 0
+    for i, (u, v) in enumerate(zip(route[:-1], route[1:])):
+        parallel = adj[u].get(v)
+        if not parallel:
+            continue
+        edge = min(parallel.values(), key=lambda e: e.get('length', inf))
+        tourism = edge.get('tourism')
+        lengths[n] = edge.get('length', 0)
+        fun_weights[n] = edge.get('fun_weight', lengths[n])
+        path_ids[n] = PATH_IDX.get(edge.get('highway'), PATH_IDX['other'])
+        surface_ids[n] = SURFACE_IDX[SURFACE_TYPES.get(edge.get('surface', 'unknown'), 'unknown')]
+        area_mask[n] = (edge.get('leisure') == 'park',
+                        edge.get('natural') == 'wood',
+                        bool(edge.get('waterway')) or 'water' in (edge.get('name') or '').lower(),
+                        False,
+                        tourism == 'viewpoint',
+                        tourism == 'attraction')
+        if detail:
+            name = edge.get('name')
+            names[n] = name if name is not None else f'Segment {i+1}'
+        n += 1
+    
+    # Kapa bort ruttsteg som saknade kant
+    lengths, fun_weights = lengths[:n], fun_weights[:n]
+    path_ids, surface_ids, area_mask = path_ids[:n], surface_ids[:n], area_mask[:n]
+    if detail:
+        del names[n:]
+    
+    # Hastighet baserat på vägtyp och yta, och tid per segment i minuter
+    speeds = PATH_SPEEDS[path_ids] * SURFACE_SPEED_MODIFIERS[surface_ids]
+    times = (lengths / 1000) * (60 / speeds)
+    
+    # Summera per kategori i platta arrayer och bygg resultatdictarna en gång
+    path_sums, surface_sums, area_sums = accumulate_categories(
+        lengths, times, path_ids, surface_ids, area_mask)
+    (path_dist, path_time), (surface_dist, surface_time), (area_dist, area_time) = (
+        path_sums.tolist(), surface_sums.tolist(), area_sums.tolist())
     
-    # Detaljerad uppdelning av vägtypes
     path_types = {
-        'sidewalk': {'distance': 0, 'time': 0, 'speed': 5.0, 'description': 'Trottoarer och gångbanor'},
-        'footway': {'distance': 0, 'time': 0, 'speed': 4.5, 'description': 'Dedikerade gångvägar'},
-        'path': {'distance': 0, 'time': 0, 'speed': 4.0, 'description': 'Naturliga stigar och vägar'},
-        'track': {'distance': 0, 'time': 0, 'speed': 3.5, 'description': 'Skogsstigar och jordvägar'},
-        'steps': {'distance': 0, 'time': 0, 'speed': 2.5, 'description': 'Trappor och stegar'},
-        'pedestrian': {'distance': 0, 'time': 0, 'speed': 4.8, 'description': 'Gågator och torg'},
-        'cycleway': {'distance': 0, 'time': 0, 'speed': 4.2, 'description': 'Cykelvägar (gång tillåten)'},
-        'residential': {'distance': 0, 'time': 0, 'speed': 4.8, 'description': 'Bostadsgator'},
-        'service': {'distance': 0, 'time': 0, 'speed': 4.5, 'description': 'Servicevägar'},
-        'other': {'distance': 0, 'time': 0, 'speed': 4.0, 'description': 'Övriga vägar'}
+        name: {'distance': path_dist[i], 'time': path_time[i],
+               'speed': PATH_SPEEDS[i].item(), 'description': PATH_DESCRIPTIONS[i]}
+        for i, name in enumerate(PATH_NAMES)
     }
     
-    # Yttyper
     surface_types = {
-        'paved': {'distance': 0, 'time': 0, 'speed_modifier': 1.0, 'description': 'Asfalt/betong'},
-        'unpaved': {'distance': 0, 'time': 0, 'speed_modifier': 0.8, 'description': 'Grus/jord'},
-        'grass': {'distance': 0, 'time': 0, 'speed_modifier': 0.7, 'description': 'Gräs'},
-        'sand': {'distance': 0, 'time': 0, 'speed_modifier': 0.6, 'description': 'Sand'},
-        'unknown': {'distance': 0, 'time': 0, 'speed_modifier': 0.9, 'description': 'Okänd yta'}
+        name: {'distance': surface_dist[i], 'time': surface_time[i],
+               'speed_modifier': SURFACE_SPEED_MODIFIERS[i].item(),
+               'description': SURFACE_DESCRIPTIONS[i]}
+        for i, name in enumerate(SURFACE_NAMES)
     }
     
-    # Speciella områden
     special_areas = {
-        'park': {'distance': 0, 'time': 0, 'description': 'Parker och grönområden'},
-        'forest': {'distance': 0, 'time': 0, 'description': 'Skog och naturområden'},
-        'waterfront': {'distance': 0, 'time': 0, 'description': 'Strandpromenader'},
-        'historic': {'distance': 0, 'time': 0, 'description': 'Historiska områden'},
-        'viewpoint': {'distance': 0, 'time': 0, 'description': 'Utsiktspunkter'},
-        'attraction': {'distance': 0, 'time': 0, 'description': 'Turistattraktioner'}
+        name: {'distance': area_dist[i], 'time': area_time[i],
+               'description': SPECIAL_AREA_DESCRIPTIONS[i]}
+        for i, name in enumerate(SPECIAL_AREA_NAMES)
     }
     
-    # Detaljerad segmentanalys
-    segments = []
-    
-    for i in range(len(route) - 1):
-        u, v = route[i], route[i + 1]
-        edge_data = G.get_edge_data(u, v)
-        if edge_data:
-            edge = list(edge_data.values())[0]
-            length = edge.get('length', 0)
-            total_distance += length
-            total_fun_weight += edge.get('fun_weight', length)
-            
-            # Bestäm vägtyp
-            hw = edge.get('highway')
-            if isinstance(hw, list): 
-                hw = hw[0] if hw else 'other'
-            
-            path_type = hw if hw in path_types else 'other'
-            
-            # Bestäm yttyp
-            surface = edge.get('surface', 'unknown')
-            if surface in ['asphalt', 'concrete', 'paved', 'paving_stones']:
-                surface_type = 'paved'
-            elif surface in ['gravel', 'dirt', 'earth', 'unpaved']:
-                surface_type = 'unpaved'
-            elif surface in ['grass', 'ground']:
-                surface_type = 'grass'
-            elif surface in ['sand']:
-                surface_type = 'sand'
-            else:
-                surface_type = 'unknown'
-            
-            # Beräkna hastighet baserat på vägtyp och yta
-            base_speed = path_types[path_type]['speed']
-            speed_modifier = surface_types[surface_type]['speed_modifier']
-            actual_speed = base_speed * speed_modifier
-            
-            # Beräkna tid för detta segment
-            segment_time = (length / 1000) * (60 / actual_speed)  # minuter
-            
-            # Uppdatera statistik
-            path_types[path_type]['distance'] += length
-            path_types[path_type]['time'] += segment_time
-            
-            surface_types[surface_type]['distance'] += length
-            surface_types[surface_type]['time'] += segment_time
-            
-            # Kolla speciella områden
-            segment_features = []
-            if edge.get('leisure') == 'park':
-                special_areas['park']['distance'] += length
-                special_areas['park']['time'] += segment_time
-                segment_features.append('park')
-            
-            if edge.get('natural') == 'wood':
-                special_areas['forest']['distance'] += length
-                special_areas['forest']['time'] += segment_time
-                segment_features.append('forest')
-            
-            if edge.get('tourism') == 'viewpoint':
-                special_areas['viewpoint']['distance'] += length
-                special_areas['viewpoint']['time'] += segment_time
-                segment_features.append('viewpoint')
-            
-            if edge.get('tourism') == 'attraction':
-                special_areas['attraction']['distance'] += length
-                special_areas['attraction']['time'] += segment_time
-                segment_features.append('attraction')
-            
-            if edge.get('waterway') or 'water' in edge.get('name', '').lower():
-                special_areas['waterfront']['distance'] += length
-                special_areas['waterfront']['time'] += segment_time
-                segment_features.append('waterfront')
-            
-            # Spara segmentinfo
-            segments.append({
-                'length': length,
-                'time': segment_time,
-                'path_type': path_type,
-                'surface_type': surface_type,
-                'speed': actual_speed,
-                'features': segment_features,
-                'name': edge.get('name', f'Segment {i+1}')
-            })
+    total_distance = lengths.sum().item()
+    total_fun_weight = fun_weights.sum().item()
     
     # Beräkna total tid
-    total_time = sum(seg['time'] for seg in segments)
+    total_time = times.sum().item()
     
-    return {
+    stats = {
         'distance': total_distance,
         'fun_weight': total_fun_weight,
         'fun_score': total_distance / total_fun_weight if total_fun_weight > 0 else 0,
@@ -384,9 +670,43 @@ def calculate_detailed_route_stats(G, route):
         'path_types': path_types,
         'surface_types': surface_types,
         'special_areas': special_areas,
-        'segments': segments,
+        'active_paths': active_categories(path_types),
+        'active_surfaces': active_categories(surface_types),
+        'active_areas': active_categories(special_areas),
         'avg_speed': (total_distance / 1000) / (total_time / 60) if total_time > 0 else 0
     }
+    if detail:
+        stats['segments'] = {
+            'length': lengths,
+            'time': times,
+            'speed': speeds,
+            'path_id': path_ids,
+            'surface_id': surface_ids,
+            'area_mask': area_mask,
+            'name': names,
+        }
+    return stats
+
+def route_summary_stats(G, route):
+    """
+    Statistik för jämförelsetabellen, rekommendationerna och kartan:
+    totaler samt tid/distans per vägtyp, yta och speciellt område.
+    """
+    return _route_stats(G, route, detail=False)
+
+def route_detail_stats(G, route):
+    """
+    Beräknar mycket detaljerad statistik för rutten med tidsuppdelning.
+    Som route_summary_stats, plus segmenten som kolumner (NumPy-arrayer)
+    under 'segments'; använd route_segment() för ett enskilt segment som dict.
+    """
+    return _route_stats(G, route, detail=True)
+
+def ensure_route_details(G, route_data):
+    """Uppgraderar en rutts summary-statistik till detaljstatistik vid behov"""
+    if 'segments' not in route_data['stats']:
+        route_data['stats'] = route_detail_stats(G, route_data['route'])
+    return route_data
 
 def compute_multiple_routes(start, end, buffer_dist=5000):
     """
@@ -397,17 +717,25 @@ def compute_multiple_routes(start, end, buffer_dist=5000):
     
     G = fetch_graph(start, end, buffer_dist)
     
-    # Hitta närmaste noder
-    orig = ox.distance.nearest_nodes(G, X=start[1], Y=start[0])
-    dest = ox.distance.nearest_nodes(G, X=end[1], Y=end[0])
+    # Hitta närmaste noder (ett anrop, ett spatialt index för båda punkterna)
+    orig, dest = ox.distance.nearest_nodes(G, X=[start[1], end[1]], Y=[start[0], end[0]])
+    
+    # En CSR-topologi, tre viktvektorer (vikterna beräknas i ett pass)
+    nodes, node_to_idx, matrices = routing_graph(G)
+    orig_idx, dest_idx = node_to_idx[orig], node_to_idx[dest]
     
     routes = []
     
+    # Övre gränser för sökningarna: den kortaste ruttens kostnad under varje vikt
+    upper_bounds = {}
+    
     # 1. Kortaste rutt (standard längd)
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Computing shortest route...")
     try:
-        route_shortest = nx.shortest_path(G, orig, dest, weight='length')
-        stats = calculate_detailed_route_stats(G, route_shortest)
+        route_shortest = shortest_path_csr(matrices['length'], nodes, orig_idx, dest_idx)
+        for weight in ('fun_weight', 'balanced_weight'):
+            upper_bounds[weight] = path_cost(matrices[weight], node_to_idx, route_shortest)
+        stats = route_summary_stats(G, route_shortest)
         routes.append({
             'name': 'SHORTEST',
             'description': 'Fastest direct route',
@@ -419,12 +747,26 @@ def compute_multiple_routes(start, end, buffer_dist=5000):
     except nx.NetworkXNoPath:
         print(f"[{datetime.now().strftime('%H:%M:%S')}] No shortest path found")
     
+    # Med en känd övre gräns räcker det att söka bland noderna inom
+    # fågelvägsellipsen kring start och mål
+    keep = {weight: goal_directed_nodes(G, orig_idx, dest_idx, MIN_COST_PER_METER[weight], bound)
+            for weight, bound in upper_bounds.items()}
+    
+    # 2 + 3. Roligaste och balanserad rutt är oberoende sökningar och körs
+    # parallellt; SciPys dijkstra släpper GIL:en
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Computing most fun and balanced routes...")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        future_fun = executor.submit(shortest_path_csr, matrices['fun_weight'], nodes,
+                                     orig_idx, dest_idx, upper_bounds.get('fun_weight', inf),
+                                     keep.get('fun_weight'))
+        future_balanced = executor.submit(shortest_path_csr, matrices['balanced_weight'], nodes,
+                                          orig_idx, dest_idx, upper_bounds.get('balanced_weight', inf),
+                                          keep.get('balanced_weight'))
+    
     # 2. Roligaste rutt (fun_weight)
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Computing most fun route...")
-    annotate_fun_weights(G)
     try:
-        route_fun = nx.shortest_path(G, orig, dest, weight='fun_weight')
-        stats = calculate_detailed_route_stats(G, route_fun)
+        route_fun = future_fun.result()
+        stats = route_summary_stats(G, route_fun)
         routes.append({
             'name': 'MOST_FUN',
             'description': 'Maximum fun score route',
@@ -437,15 +779,9 @@ def compute_multiple_routes(start, end, buffer_dist=5000):
         print(f"[{datetime.now().strftime('%H:%M:%S')}] No fun path found")
     
     # 3. Balanserad rutt (kombination av längd och fun)
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Computing balanced route...")
-    for u, v, k, data in G.edges(keys=True, data=True):
-        fun_weight = data.get('fun_weight', data.get('length', 0))
-        length = data.get('length', 0)
-        data['balanced_weight'] = (length * 0.7) + (fun_weight * 0.3)
-    
     try:
-        route_balanced = nx.shortest_path(G, orig, dest, weight='balanced_weight')
-        stats = calculate_detailed_route_stats(G, route_balanced)
+        route_balanced = future_balanced.result()
+        stats = route_summary_stats(G, route_balanced)
         routes.append({
             'name': 'BALANCED',
             'description': 'Good mix of speed and fun',
@@ -483,11 +819,10 @@ def display_route_comparison(routes):
         stats = route['stats']
         
         # Hitta huvudsaklig yttyp
-        main_surface = max(stats['surface_types'].items(), 
-                          key=lambda x: x[1]['distance'] if x[1]['distance'] > 0 else 0)[0]
+        main_surface = (stats['active_surfaces'] or list(stats['surface_types'].items()))[0][0]
         
         # Räkna speciella områden
-        special_count = sum(1 for v in stats['special_areas'].values() if v['distance'] > 0)
+        special_count = len(stats['active_areas'])
         
         print(f"{route['name']:<12} "
               f"{stats['estimated_time']:.0f}min "
@@ -522,28 +857,30 @@ def display_detailed_walkthrough(route_data):
     
     # Visa tidsuppdelning per vägtyp
     print("TIME BREAKDOWN BY PATH TYPE:")
-    for path_type, data in stats['path_types'].items():
-        if data['distance'] > 0:
-            print(f"  {path_type.upper():<12} {data['time']:.1f}min ({data['distance']:.0f}m) - {data['description']}")
+    for path_type, data in stats['active_paths']:
+        print(f"  {path_type.upper():<12} {data['time']:.1f}min ({data['distance']:.0f}m) - {data['description']}")
     
     print("\nTIME BREAKDOWN BY SURFACE:")
-    for surface_type, data in stats['surface_types'].items():
-        if data['distance'] > 0:
-            print(f"  {surface_type.upper():<8} {data['time']:.1f}min ({data['distance']:.0f}m) - {data['description']}")
+    for surface_type, data in stats['active_surfaces']:
+        print(f"  {surface_type.upper():<8} {data['time']:.1f}min ({data['distance']:.0f}m) - {data['description']}")
     
     print("\nSPECIAL AREAS YOU'LL WALK THROUGH:")
-    special_found = False
-    for area_type, data in stats['special_areas'].items():
-        if data['distance'] > 0:
-            special_found = True
-            print(f"  {area_type.upper():<12} {data['time']:.1f}min ({data['distance']:.0f}m) - {data['description']}")
+    for area_type, data in stats['active_areas']:
+        print(f"  {area_type.upper():<12} {data['time']:.1f}min ({data['distance']:.0f}m) - {data['description']}")
     
-    if not special_found:
+    if not stats['active_areas']:
         print("  No special areas detected on this route")
     
     # Visa de längsta segmenten
     print(f"\nLONGEST SEGMENTS (showing top 5):")
-    longest_segments = sorted(stats['segments'], key=lambda x: x['length'], reverse=True)[:5]
+    segments = stats['segments']
+    lengths = segments['length']
+    order = np.arange(len(lengths))
+    if len(lengths) > 5:
+        # Partiell selektion, O(n), och sortera bara de fem valda
+        order = np.argpartition(-lengths, 5)[:5]
+    order = order[np.argsort(-lengths[order], kind='stable')]
+    longest_segments = [route_segment(segments, j) for j in order]
     for i, seg in enumerate(longest_segments, 1):
         features_str = f" [{', '.join(seg['features'])}]" if seg['features'] else ""
         print(f"  {i}. {seg['length']:.0f}m ({seg['time']:.1f}min) - {seg['path_type']} on {seg['surface_type']}{features_str}")
@@ -566,14 +903,13 @@ def display_route_recommendations(routes):
         print(f"  Fun Score: {stats['fun_score']:.2f} | Avg Speed: {stats['avg_speed']:.1f} km/h")
         
         # Visa huvudsakliga vägtyper
-        main_paths = [(k, v) for k, v in stats['path_types'].items() if v['distance'] > 0]
-        main_paths.sort(key=lambda x: x[1]['distance'], reverse=True)
+        main_paths = stats['active_paths']
         if main_paths:
             top_path = main_paths[0]
             print(f"  Mainly: {top_path[1]['description']} ({top_path[1]['time']:.0f}min)")
         
         # Visa speciella funktioner
-        special_features = [k for k, v in stats['special_areas'].items() if v['distance'] > 0]
+        special_features = [k for k, v in stats['active_areas']]
         if special_features:
             print(f"  Features: {', '.join(special_features)}")
         
@@ -611,8 +947,8 @@ if __name__ == '__main__':
     # Visa detaljerade rekommendationer
     display_route_recommendations(routes)
     
-    # Visa detaljerad genomgång av den roligaste rutten
-    display_detailed_walkthrough(best_routes['most_fun'])
+    # Visa detaljerad genomgång av den roligaste rutten (bara den behöver segmenten)
+    display_detailed_walkthrough(ensure_route_details(G, best_routes['most_fun']))
     
     # Skapa karta med alla rutter
     all_coords, map_file = create_multi_route_map(G, routes, start, end)
@@ -4,143 +4,326 @@ Parse OSM dump JSON files to analyze node attributes
 Counts all unique attributes and their occurrences, excluding street_count-only nodes
 """
 
+import itertools
 import json
+import mmap
+import os
 import sys
-from collections import Counter, defaultdict
+import time
+import numpy as np
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib decoder
+    orjson = None
+try:
+    import json_stream
+except ImportError:  # fall back to decoding the whole file
+    json_stream = None
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-def parse_osm_attributes(json_file):
+# Log lines are stamped with seconds elapsed since the module was loaded
+_T0 = time.monotonic()
+
+def _ts():
+    return f"[{time.monotonic() - _T0:7.2f}s]"
+
+# Number of sample nodes shown per attribute
+SAMPLE_NODES = 3
+
+# Attribute occurrences collected before they are flushed into the counters
+COUNT_BATCH_SIZE = 10000
+
+# Nodes per chunk handed to a worker process
+SCAN_CHUNK_SIZE = 50000
+
+# Line templates for the per-attribute / per-value report loops, parsed once
+FREQUENCY_ROW = "{0:<30} {1:<10} {2:>8.1f}%\n"
+VALUE_ROW = "  {0:<25} {1:>5} ({2:>5.1f}%)\n"
+SAMPLE_ROW = "  Node {0} at ({1:.6f}, {2:.6f}) = '{3}'\n"
+REPORT_FREQUENCY_ROW = "{0}: {1} nodes ({2:.1f}%)\n"
+REPORT_VALUE_ROW = "  {0}: {1} ({2:.1f}%)\n"
+
+def iter_nodes(f):
     """
-    Parse OSM JSON file and analyze node attributes
+    Yield the node dicts of an OSM dump opened in binary mode.
+    With json-stream installed the 'nodes' array is streamed one node at a
+    time instead of materializing the whole document. Otherwise the file is
+    memory-mapped and orjson parses straight from the mapped pages, without
+    first copying the file into a bytes object.
     """
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Parsing OSM data from {json_file}")
-    
-    try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        print(f"Error: File {json_file} not found")
-        return
-    except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON file - {e}")
+    if json_stream is not None:
+        try:
+            nodes = json_stream.load(f)['nodes']
+        except KeyError:
+            return
+        for node in nodes:
+            yield json_stream.to_standard_types(node)
         return
     
-    # Statistics counters
-    total_nodes = len(data.get('nodes', []))
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if orjson is not None:
+            with memoryview(mm) as buf:
+                data = orjson.loads(buf)
+        else:
+            data = json.loads(mm[:])
+    
+    # Bind the node list once and drop the rest of the document (edges, pois)
+    # before the scan starts
+    nodes = data.get('nodes') or []
+    del data
+    yield from nodes
+
+def count_attributes(name_index, name_counts, attribute_values, attr_names, attr_values):
+    """
+    Add a batch of parallel attribute name/value columns to the counters and
+    clear the columns. Names are interned to small int ids through name_index;
+    name_counts is a dense int64 array indexed by id (grown as needed and
+    returned) and the value counters are keyed by id. map(), np.bincount and
+    Counter consume the columns in C, so there is no per-attribute Python bytecode.
+    attr_values is left empty in summary mode, and then only names are counted.
+    """
+    name_ids = list(map(name_index.__getitem__, attr_names))
+    batch_counts = np.bincount(np.asarray(name_ids, dtype=np.intp), minlength=len(name_index))
+    if len(batch_counts) > len(name_counts):
+        grown = np.zeros(2 * len(batch_counts), dtype=np.int64)
+        grown[:len(name_counts)] = name_counts
+        name_counts = grown
+    name_counts[:len(batch_counts)] += batch_counts
+    for (name_id, attr_value), freq in Counter(zip(name_ids, attr_values)).items():
+        attribute_values[name_id][attr_value] += freq
+    attr_names.clear()
+    attr_values.clear()
+    return name_counts
+
+def scan_nodes(nodes, detail=True):
+    """
+    Scan a chunk of node dicts and return its partial statistics, keyed by
+    attribute name so chunks from different processes can be merged.
+    """
     nodes_with_only_street_count = 0
     nodes_with_attributes = 0
     
-    # Attribute counters
-    attribute_counts = Counter()
+    # Attribute counters keyed by interned name id (assigned on first sight),
+    # fed in batches from the name/value columns
+    name_index = defaultdict(itertools.count().__next__)
+    name_counts = np.zeros(64, dtype=np.int64)
     attribute_values = defaultdict(Counter)
+    attr_names = []
+    attr_values = []
+    # (node_id, lat, lng, value) samples, at most SAMPLE_NODES per attribute,
+    # and the attributes whose samples are already complete
     nodes_by_attribute = defaultdict(list)
+    sampled = set()
     
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Analyzing {total_nodes} nodes...")
-    
-    for node in data.get('nodes', []):
-        node_id = node['node_id']
-        lat = node['lat']
-        lng = node['lng']
-        attributes = node.get('attributes', {})
-        
-        # Skip nodes with only street_count attribute
-        if len(attributes) == 1 and 'street_count' in attributes:
-            nodes_with_only_street_count += 1
+    for node in nodes:
+        # Ignore street_count as requested; one length check then classifies
+        # the node (no attributes, only street_count, or interesting)
+        attributes = node.get('attributes') or {}
+        had_street_count = attributes.pop('street_count', None) is not None
+        n_attributes = len(attributes)
+        nodes_with_attributes += n_attributes > 0
+        nodes_with_only_street_count += had_street_count and not n_attributes
+        if not n_attributes:
             continue
         
-        # Skip empty attributes
-        if not attributes:
-            continue
+        # Collect attribute names and values, counted a batch at a time
+        attr_names.extend(attributes)
+        if detail:
+            attr_values.extend(attributes.values())
+        if len(attr_names) >= COUNT_BATCH_SIZE:
+            name_counts = count_attributes(name_index, name_counts, attribute_values,
+                                           attr_names, attr_values)
         
-        nodes_with_attributes += 1
+        # Keep the first few sample nodes per attribute; once every attribute
+        # on the node has its samples (the common case) this is one subset check
+        if not detail or attributes.keys() <= sampled:
+            continue
         
-        # Count each attribute type
+        node_id = node['node_id']
+        lat = node['lat']
+        lng = node['lng']
         for attr_name, attr_value in attributes.items():
-            if attr_name != 'street_count':  # Ignore street_count as requested
-                attribute_counts[attr_name] += 1
-                attribute_values[attr_name][attr_value] += 1
-                nodes_by_attribute[attr_name].append({
-                    'node_id': node_id,
-                    'lat': lat,
-                    'lng': lng,
-                    'value': attr_value
-                })
-    
-    # Print summary statistics
-    print(f"\n{'='*60}")
-    print(f"OSM NODE ATTRIBUTE ANALYSIS")
-    print(f"{'='*60}")
-    print(f"Total nodes: {total_nodes:,}")
-    print(f"Nodes with only 'street_count': {nodes_with_only_street_count:,}")
-    print(f"Nodes with interesting attributes: {nodes_with_attributes:,}")
-    print(f"Unique attribute types found: {len(attribute_counts)}")
+            if attr_name in sampled:
+                continue
+            samples = nodes_by_attribute[attr_name]
+            samples.append((node_id, lat, lng, attr_value))
+            if len(samples) == SAMPLE_NODES:
+                sampled.add(attr_name)
+    
+    name_counts = count_attributes(name_index, name_counts, attribute_values,
+                                   attr_names, attr_values)
+    
+    # Map name ids back to attribute names (ids are in first-seen order)
+    id_to_name = list(name_index)
+    return {
+        'total_nodes': len(nodes),
+        'nodes_with_only_street_count': nodes_with_only_street_count,
+        'nodes_with_attributes': nodes_with_attributes,
+        'attribute_counts': Counter(dict(zip(id_to_name, name_counts.tolist()))),
+        'attribute_values': {id_to_name[i]: values for i, values in attribute_values.items()},
+        'nodes_by_attribute': dict(nodes_by_attribute),
+    }
+
+def merge_scans(result, part):
+    """Merge a later chunk's scan_nodes result into result, keeping first-seen order"""
+    for key in ('total_nodes', 'nodes_with_only_street_count', 'nodes_with_attributes'):
+        result[key] += part[key]
+    result['attribute_counts'].update(part['attribute_counts'])
+    for attr_name, values in part['attribute_values'].items():
+        result['attribute_values'].setdefault(attr_name, Counter()).update(values)
+    for attr_name, samples in part['nodes_by_attribute'].items():
+        kept = result['nodes_by_attribute'].setdefault(attr_name, [])
+        kept.extend(samples[:SAMPLE_NODES - len(kept)])
+
+def iter_chunks(nodes, size):
+    """Group an iterator of nodes into lists of at most size nodes"""
+    chunk = list(itertools.islice(nodes, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(nodes, size))
+
+def scan_dump(f, detail=True, workers=None):
+    """
+    Scan every node in the dump. The first chunk is scanned in-process; any
+    further chunks go to a process pool and are merged in order, with a
+    bounded number of chunks in flight so a streamed dump stays streamed.
+    """
+    chunks = iter_chunks(iter_nodes(f), SCAN_CHUNK_SIZE)
+    result = scan_nodes(next(chunks, []), detail)
+    second = next(chunks, None)
+    if second is None:
+        return result
+    
+    workers = workers or os.cpu_count() or 1
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk in itertools.chain([second], chunks):
+            pending.append(executor.submit(scan_nodes, chunk, detail))
+            if len(pending) > 2 * workers:
+                merge_scans(result, pending.popleft().result())
+        while pending:
+            merge_scans(result, pending.popleft().result())
+    return result
+
+def parse_osm_attributes(json_file, detail=True, workers=None):
+    """
+    Parse OSM JSON file and analyze node attributes
+    With detail=False only the attribute frequencies are computed; value
+    distributions, sample nodes and the detailed breakdowns are skipped.
+    workers caps the processes used for dumps larger than one scan chunk
+    (default: one per CPU).
+    """
+    print(f"{_ts()} Parsing OSM data from {json_file}")
+    
+    try:
+        f = open(json_file, 'rb')
+    except FileNotFoundError:
+        print(f"Error: File {json_file} not found")
+        return
+    
+    print(f"{_ts()} Analyzing nodes...")
+    
+    with f:
+        try:
+            scan = scan_dump(f, detail, workers)
+        except ValueError as e:  # json.JSONDecodeError and json-stream's parse errors
+            print(f"Error: Invalid JSON file - {e}")
+            return
+    
+    total_nodes = scan['total_nodes']
+    nodes_with_only_street_count = scan['nodes_with_only_street_count']
+    nodes_with_attributes = scan['nodes_with_attributes']
+    attribute_counts = scan['attribute_counts']
+    attribute_values = scan['attribute_values']
+    nodes_by_attribute = scan['nodes_by_attribute']
+    
+    print(f"{_ts()} Analyzed {total_nodes} nodes")
+    
+    # Rank attributes (and their values) once for both reports
+    ranked = attribute_counts.most_common()
+    ranked_values = {attr_name: attribute_values[attr_name].most_common()
+                     for attr_name, _ in ranked} if detail else {}
+    
+    # Print summary statistics (the console report is built as one string and written once)
+    lines = [
+        f"\n{'='*60}\n",
+        f"OSM NODE ATTRIBUTE ANALYSIS\n",
+        f"{'='*60}\n",
+        f"Total nodes: {total_nodes:,}\n",
+        f"Nodes with only 'street_count': {nodes_with_only_street_count:,}\n",
+        f"Nodes with interesting attributes: {nodes_with_attributes:,}\n",
+        f"Unique attribute types found: {len(attribute_counts)}\n",
+    ]
     
     if not attribute_counts:
-        print("\nNo interesting attributes found (all nodes only have street_count)")
+        lines.append("\nNo interesting attributes found (all nodes only have street_count)\n")
+        sys.stdout.write(''.join(lines))
         return
     
     # Print attribute frequency table
-    print(f"\n{'ATTRIBUTE FREQUENCY':<30} {'COUNT':<10} {'PERCENTAGE'}")
-    print(f"{'-'*55}")
-    for attr_name, count in attribute_counts.most_common():
-        percentage = (count / nodes_with_attributes) * 100
-        print(f"{attr_name:<30} {count:<10} {percentage:>8.1f}%")
+    lines.append(f"\n{'ATTRIBUTE FREQUENCY':<30} {'COUNT':<10} {'PERCENTAGE'}\n")
+    lines.append(f"{'-'*55}\n")
+    for attr_name, count in ranked:
+        lines.append(FREQUENCY_ROW.format(attr_name, count, count / nodes_with_attributes * 100))
     
     # Print detailed breakdown for each attribute
-    print(f"\n{'='*60}")
-    print(f"DETAILED ATTRIBUTE BREAKDOWN")
-    print(f"{'='*60}")
-    
-    for attr_name, count in attribute_counts.most_common():
-        print(f"\n{attr_name.upper()} (found in {count} nodes):")
-        print(f"{'-'*40}")
-        
-        # Show value distribution
-        values = attribute_values[attr_name]
-        print("Values and their frequencies:")
-        for value, freq in values.most_common(10):  # Show top 10 values
-            percentage = (freq / count) * 100
-            print(f"  {value:<25} {freq:>5} ({percentage:>5.1f}%)")
+    if detail:
+        lines.append(f"\n{'='*60}\n")
+        lines.append(f"DETAILED ATTRIBUTE BREAKDOWN\n")
+        lines.append(f"{'='*60}\n")
         
-        if len(values) > 10:
-            print(f"  ... and {len(values) - 10} more values")
+        for attr_name, count in ranked:
+            lines.append(f"\n{attr_name.upper()} (found in {count} nodes):\n")
+            lines.append(f"{'-'*40}\n")
+            
+            # Show value distribution
+            values = ranked_values[attr_name]
+            lines.append("Values and their frequencies:\n")
+            for value, freq in values[:10]:  # Show top 10 values
+                lines.append(VALUE_ROW.format(value, freq, freq / count * 100))
+            
+            if len(values) > 10:
+                lines.append(f"  ... and {len(values) - 10} more values\n")
+            
+            # Show sample nodes with this attribute
+            lines.append(f"\nSample nodes with '{attr_name}' attribute:\n")
+            for sample in nodes_by_attribute[attr_name]:
+                lines.append(SAMPLE_ROW.format(*sample))
+    
+    sys.stdout.write(''.join(lines))
+    
+    # Save detailed report to file, built as one string and written with a single write
+    parts = [
+        f"OSM Node Attribute Analysis Report\n",
+        f"Generated: {datetime.now().isoformat()}\n",
+        f"Source: {json_file}\n",
+        f"{'='*60}\n\n",
+        f"SUMMARY:\n",
+        f"Total nodes: {total_nodes:,}\n",
+        f"Nodes with only 'street_count': {nodes_with_only_street_count:,}\n",
+        f"Nodes with interesting attributes: {nodes_with_attributes:,}\n",
+        f"Unique attribute types: {len(attribute_counts)}\n\n",
+        f"ATTRIBUTE FREQUENCIES:\n",
+    ]
+    for attr_name, count in ranked:
+        parts.append(REPORT_FREQUENCY_ROW.format(attr_name, count, count / nodes_with_attributes * 100))
+    
+    if detail:
+        parts.append(f"\nDETAILED BREAKDOWN:\n")
+        parts.append(f"{'='*40}\n")
         
-        # Show sample nodes with this attribute
-        sample_nodes = nodes_by_attribute[attr_name][:3]  # Show 3 sample nodes
-        print(f"\nSample nodes with '{attr_name}' attribute:")
-        for node in sample_nodes:
-            print(f"  Node {node['node_id']} at ({node['lat']:.6f}, {node['lng']:.6f}) = '{node['value']}'")
+        for attr_name, count in ranked:
+            parts.append(f"\n{attr_name.upper()}:\n")
+            for value, freq in ranked_values[attr_name]:
+                parts.append(REPORT_VALUE_ROW.format(value, freq, freq / count * 100))
     
-    # Save detailed report to file
     report_filename = f"osm_attribute_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
     with open(report_filename, 'w', encoding='utf-8') as f:
-        f.write(f"OSM Node Attribute Analysis Report\n")
-        f.write(f"Generated: {datetime.now().isoformat()}\n")
-        f.write(f"Source: {json_file}\n")
-        f.write(f"{'='*60}\n\n")
-        
-        f.write(f"SUMMARY:\n")
-        f.write(f"Total nodes: {total_nodes:,}\n")
-        f.write(f"Nodes with only 'street_count': {nodes_with_only_street_count:,}\n")
-        f.write(f"Nodes with interesting attributes: {nodes_with_attributes:,}\n")
-        f.write(f"Unique attribute types: {len(attribute_counts)}\n\n")
-        
-        f.write(f"ATTRIBUTE FREQUENCIES:\n")
-        for attr_name, count in attribute_counts.most_common():
-            percentage = (count / nodes_with_attributes) * 100
-            f.write(f"{attr_name}: {count} nodes ({percentage:.1f}%)\n")
-        
-        f.write(f"\nDETAILED BREAKDOWN:\n")
-        f.write(f"{'='*40}\n")
-        
-        for attr_name, count in attribute_counts.most_common():
-            f.write(f"\n{attr_name.upper()}:\n")
-            values = attribute_values[attr_name]
-            for value, freq in values.most_common():
-                percentage = (freq / count) * 100
-                f.write(f"  {value}: {freq} ({percentage:.1f}%)\n")
+        f.write(''.join(parts))
     
-    print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Detailed report saved to {report_filename}")
+    print(f"\n{_ts()} Detailed report saved to {report_filename}")
     
     return {
         'total_nodes': total_nodes,
@@ -150,8 +333,13 @@ def parse_osm_attributes(json_file):
     }
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python parse_osm_attributes.py <osm_dump_file.json>")
+    args = sys.argv[1:]
+    detail = '--detail' in args
+    if detail:
+        args.remove('--detail')
+    
+    if len(args) != 1:
+        print("Usage: python parse_osm_attributes.py [--detail] <osm_dump_file.json>")
         print("\nAvailable OSM dump files:")
         import glob
         osm_files = glob.glob("osm_dump_*.json")
@@ -159,8 +347,8 @@ def main():
             print(f"  {f}")
         sys.exit(1)
     
-    json_file = sys.argv[1]
-    result = parse_osm_attributes(json_file)
+    json_file = args[0]
+    result = parse_osm_attributes(json_file, detail=detail)
     
     if result:
         print(f"\nAnalysis complete! Found {len(result['attribute_counts'])} unique attribute types.")
@@ -4,14 +4,121 @@ POI-Based Routing Engine
 Implements time-constrained and preference-based routing using OSM data and POIs
 """
 
+import copy
+import filecmp
 import json
 import math
+import os
+import shutil
 import networkx as nx
+import numpy as np
 import osmnx as ox
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import cycle, islice
 import heapq
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+POI_GRID_SIZE = 0.001  # ~100m at these latitudes
+EARTH_RADIUS_M = 6371000  # Earth's radius in meters
+
+# POI categories produced by _categorize_poi, stored per POI as int8 codes
+POI_CATEGORIES = ('restaurants', 'fast_food', 'cafes', 'bars_pubs', 'nature', 'recreation', 'shops',
+                  'viewpoints', 'tourism', 'education', 'transport', 'other')
+CATEGORY_TO_ID = {category: i for i, category in enumerate(POI_CATEGORIES)}
+# Indexed by category code; the code -1 of filtered-out POIs wraps around to None
+CATEGORY_NAMES = POI_CATEGORIES + (None,)
+
+# Lookup tables for _categorize_poi, consulted in the same priority order as its rules
+FOOD_AMENITY_CATEGORY = {'restaurant': 'restaurants', 'fast_food': 'fast_food', 'cafe': 'cafes',
+                         'bar': 'bars_pubs', 'pub': 'bars_pubs'}
+NATURE_NATURAL = frozenset(('tree', 'water', 'park'))
+NATURE_LANDUSE = frozenset(('forest', 'grass', 'garden'))
+LEISURE_CATEGORY = {'garden': 'nature', 'park': 'recreation', 'playground': 'recreation',
+                    'sports_centre': 'recreation', 'pitch': 'recreation'}
+VIEWPOINT_NATURAL = frozenset(('peak', 'summit'))
+TOURISM_TOURISM = frozenset(('attraction', 'museum', 'gallery', 'monument'))
+LATE_AMENITY_CATEGORY = {'theatre': 'tourism', 'cinema': 'tourism', 'arts_centre': 'tourism',
+                         'school': 'education', 'university': 'education', 'college': 'education',
+                         'library': 'education', 'bicycle_parking': 'transport',
+                         'parking_space': 'transport', 'bicycle_rental': 'transport'}
+IGNORED_AMENITY = frozenset(('bench', 'waste_basket', 'toilets', 'atm'))
+
+# Highway types grouped by how attractive they are when nature paths are preferred.
+# Edges store the group code; PATH_MULT_NATURE holds the multiplier per code.
+HWY_CODE = {'path': 0, 'footway': 0, 'track': 0, 'bridleway': 0,
+            'cycleway': 1, 'pedestrian': 1,
+            'residential': 2, 'living_street': 2,
+            'primary': 3, 'secondary': 3, 'tertiary': 3, 'trunk': 3}
+HWY_OTHER = 4
+PATH_MULT_NATURE = np.array([0.3,   # Much more attractive
+                             0.5,   # Moderately attractive
+                             1.5,   # Slightly less attractive
+                             3.0,   # Much less attractive (avoid main roads)
+                             2.0])  # Default penalty for other roads
+
+# Offsets of the 3x3 block of grid cells searched around a point
+NEIGHBOR_DLAT = np.repeat(np.arange(-1, 2), 3)
+NEIGHBOR_DLNG = np.tile(np.arange(-1, 2), 3)
+
+def _grid_cells(lat, lng):
+    """Grid cell coordinates of one or more points"""
+    return (np.floor(np.divide(lat, POI_GRID_SIZE)).astype(np.int64),
+            np.floor(np.divide(lng, POI_GRID_SIZE)).astype(np.int64))
+
+def _spread_bits(v):
+    """Spread the low 31 bits of each value onto the even bit positions of an int64"""
+    v = v & 0x7FFFFFFF
+    v = (v | (v << 16)) & 0x0000FFFF0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v << 2)) & 0x3333333333333333
+    return (v | (v << 1)) & 0x5555555555555555
+
+def _concat_ranges(starts, ends):
+    """Concatenate arange(start, end) for every pair without a Python loop"""
+    lengths = ends - starts
+    return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+def _haversine_within(lat0, lng0, lats, lngs, radius):
+    """Indices of the points within radius meters of lat0/lng0 and their distances
+    
+    The haversine term a is built with in-place ufuncs, and since the distance grows
+    monotonically with a the radius test runs on a first. Only the points that pass
+    (with a hair of slack, re-checked exactly below) pay for the sqrt/arctan2 tail.
+    """
+    a = np.subtract(lats, lat0)
+    np.radians(a, out=a)
+    a /= 2
+    np.sin(a, out=a)
+    np.square(a, out=a)
+    
+    cross = np.subtract(lngs, lng0)
+    np.radians(cross, out=cross)
+    cross /= 2
+    np.sin(cross, out=cross)
+    np.square(cross, out=cross)
+    cos_lat = np.radians(lats)
+    np.cos(cos_lat, out=cos_lat)
+    cos_lat *= np.cos(np.radians(lat0))
+    cos_lat *= cross
+    a += cos_lat
+    
+    half_angle = min(radius / (2 * EARTH_RADIUS_M), math.pi / 2)
+    idx = np.flatnonzero(a <= math.sin(half_angle) ** 2 * (1 + 1e-9))
+    a = a[idx]
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+    distances = EARTH_RADIUS_M * c
+    
+    mask = distances <= radius
+    return idx[mask], distances[mask]
 
 class POIRoutingEngine:
     def __init__(self, enhanced_osm_file: str):
@@ -23,7 +130,11 @@ class POIRoutingEngine:
         
         self.graph = None
         self.pois = self.osm_data.get('pois', [])
-        self.poi_spatial_index = {}
+        self.generated_at = None  # Batch timestamp for result metadata; None means "now"
+        self._route_cache = {}  # find_route results per snapped nodes, preferences and limits
+        self._node_poi_cache = {}  # _node_poi_indices results per (node, radius)
+        self._bonus_cache = {}  # _edge_category_bonus results per influence radius
+        self._direct_route_cache = {}  # _direct_route results per (start_node, end_node)
         
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Loaded {len(self.pois)} POIs")
         self._build_graph()
@@ -62,39 +173,145 @@ class POIRoutingEngine:
             self.graph.add_edge(u, v, **attrs)
             self.graph.add_edge(v, u, **attrs)
         
+        # Dense arrays indexed by node position for bulk coordinate lookups
+        self.id_to_idx = {node: i for i, node in enumerate(self.graph.nodes)}
+        self.node_xy = np.array([(data.get('x', np.nan), data.get('y', np.nan))
+                                 for _, data in self.graph.nodes(data=True)], dtype=np.float64).reshape(-1, 2)
+        self.edge_uv = np.array([(self.id_to_idx[u], self.id_to_idx[v]) for u, v in self.graph.edges()],
+                                dtype=np.int32).reshape(-1, 2)
+        
+        # Packed CSR of the edges for routing. NetworkX yields edges grouped by source
+        # node in node order, so edge i is CSR entry i and the per-edge arrays below
+        # double as CSR data. apply_poi_weights refreshes the poi_weight matrix.
+        self.node_ids = list(self.graph.nodes)
+        self.edge_data = [data for _, _, data in self.graph.edges(data=True)]
+        self.edge_length = np.array([data['length'] for data in self.edge_data], dtype=np.float64)
+        self.edge_highway_code = np.array([self._highway_code(data.get('highway', '')) for data in self.edge_data],
+                                          dtype=np.int8)
+        self.csr_indptr = np.zeros(len(self.node_ids) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(self.edge_uv[:, 0], minlength=len(self.node_ids)), out=self.csr_indptr[1:])
+        self.csr_indices = self.edge_uv[:, 1]
+        self.weight_csr = {'length': self._edge_csr(self.edge_length),
+                           'poi_weight': self._edge_csr(self.edge_length)}
+        
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Graph built: {len(self.graph.nodes)} nodes, {len(self.graph.edges)} edges")
     
+    def _routing_view(self) -> 'POIRoutingEngine':
+        """Shallow copy of the engine for find_route calls in another thread
+        
+        Shares the graph, POI index and preference-independent caches, but has its
+        own POI-weighted CSR, so concurrent searches with different preferences do
+        not reweight each other. The graph's edge attributes keep whichever weights
+        were applied last.
+        """
+        view = copy.copy(self)
+        view.weight_csr = dict(self.weight_csr)
+        return view
+    
+    def _highway_code(self, highway_type) -> int:
+        """HWY_CODE group of an edge's highway tag (the first one if there are several)"""
+        if isinstance(highway_type, list):
+            highway_type = highway_type[0] if highway_type else ''
+        return HWY_CODE.get(highway_type, HWY_OTHER)
+    
+    def _edge_csr(self, weights: np.ndarray) -> csr_matrix:
+        """CSR adjacency matrix with one weight per edge, in graph edge order"""
+        n_nodes = len(self.node_ids)
+        return csr_matrix((weights, self.csr_indices, self.csr_indptr), shape=(n_nodes, n_nodes))
+    
     def _build_poi_spatial_index(self):
         """Build spatial index for fast POI proximity queries"""
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Building POI spatial index...")
         
-        # Simple grid-based spatial index
-        grid_size = 0.001  # ~100m at these latitudes
+        # Grid-based spatial index: POI indices sorted by the z-order (Morton) key of
+        # their cell, so every occupied cell is one contiguous slice of poi_order and
+        # neighboring cells mostly sit close together in memory
+        self.poi_lat = np.array([poi.get('lat', np.nan) for poi in self.pois], dtype=np.float64)
+        self.poi_lng = np.array([poi.get('lng', np.nan) for poi in self.pois], dtype=np.float64)
+        located = np.flatnonzero(~(np.isnan(self.poi_lat) | np.isnan(self.poi_lng)))
+        self.poi_category = np.fromiter((CATEGORY_TO_ID.get(self._categorize_poi(poi), -1) for poi in self.pois),
+                                        dtype=np.int8, count=len(self.pois))
+        
+        grid_lat, grid_lng = _grid_cells(self.poi_lat[located], self.poi_lng[located])
+        self.grid_origin = (grid_lat.min(), grid_lng.min()) if len(located) else (0, 0)
+        keys = self._z_keys(grid_lat, grid_lng)
+        order = np.argsort(keys, kind='stable')
+        self.poi_order = located[order]
+        self.poi_sorted_lat = self.poi_lat[self.poi_order]
+        self.poi_sorted_lng = self.poi_lng[self.poi_order]
+        self.poi_cell_keys, self.poi_cell_starts = np.unique(keys[order], return_index=True)
+        self.poi_cell_ends = np.append(self.poi_cell_starts[1:], len(order))
+        
+        # Nearest graph node of every located POI, snapped in one batched query
+        self.poi_nearest_node = [None] * len(self.pois)
+        if len(located):
+            nearest = ox.distance.nearest_nodes(self.graph, X=self.poi_lng[located], Y=self.poi_lat[located])
+            for i, node in zip(located.tolist(), np.asarray(nearest).tolist()):
+                self.poi_nearest_node[i] = node
+        
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Spatial index built with {len(self.poi_cell_keys)} grid cells")
+    
+    def _z_keys(self, grid_lat, grid_lng):
+        """Z-order keys of grid cells relative to the grid origin; -1 for cells outside the grid"""
+        rel_lat = grid_lat - self.grid_origin[0]
+        rel_lng = grid_lng - self.grid_origin[1]
+        inside = (rel_lat >= 0) & (rel_lng >= 0) & (rel_lat < 2**31) & (rel_lng < 2**31)
+        return np.where(inside, _spread_bits(rel_lat) | (_spread_bits(rel_lng) << 1), -1)
+    
+    def _candidate_pois(self, lat: float, lng: float) -> np.ndarray:
+        """Indices of POIs in the 3x3 grid cells around a point"""
+        if not len(self.poi_cell_keys):
+            return self.poi_order
+        
+        grid_lat, grid_lng = _grid_cells(lat, lng)
+        keys = self._z_keys(grid_lat + NEIGHBOR_DLAT, grid_lng + NEIGHBOR_DLNG)
+        cells = np.searchsorted(self.poi_cell_keys, keys).clip(max=len(self.poi_cell_keys) - 1)
+        cells = cells[self.poi_cell_keys[cells] == keys]
+        return self.poi_order[_concat_ranges(self.poi_cell_starts[cells], self.poi_cell_ends[cells])]
+    
+    def _poi_pairs(self, lats: np.ndarray, lngs: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Find all (point, POI, distance) pairs within radius for arrays of points
         
-        for poi in self.pois:
-            if 'lat' not in poi or 'lng' not in poi:
-                continue
-                
-            grid_lat = int(poi['lat'] / grid_size)
-            grid_lng = int(poi['lng'] / grid_size)
-            grid_key = (grid_lat, grid_lng)
+        Each point searches the same 3x3 grid cells as _candidate_pois. The work is
+        done one neighbor offset at a time: every point is matched to its cell at that
+        offset, expanded against the POIs in it, and distance-filtered in bulk.
+        """
+        grid_lat, grid_lng = _grid_cells(lats, lngs)
+        point_parts, poi_parts, distance_parts = [], [], []
+        
+        for dlat, dlng in zip(NEIGHBOR_DLAT, NEIGHBOR_DLNG):
+            if not len(self.poi_cell_keys):
+                break
+            keys = self._z_keys(grid_lat + dlat, grid_lng + dlng)
+            cells = np.searchsorted(self.poi_cell_keys, keys).clip(max=len(self.poi_cell_keys) - 1)
+            hits = np.flatnonzero(self.poi_cell_keys[cells] == keys)
+            starts = self.poi_cell_starts[cells[hits]]
+            ends = self.poi_cell_ends[cells[hits]]
             
-            if grid_key not in self.poi_spatial_index:
-                self.poi_spatial_index[grid_key] = []
+            # Read coordinates from the cell-sorted copies: each cell is a contiguous run
+            point_idx = np.repeat(hits, ends - starts)
+            sorted_idx = _concat_ranges(starts, ends)
+            kept, distances = _haversine_within(lats[point_idx], lngs[point_idx],
+                                                self.poi_sorted_lat[sorted_idx], self.poi_sorted_lng[sorted_idx],
+                                                radius)
             
-            self.poi_spatial_index[grid_key].append(poi)
+            point_parts.append(point_idx[kept])
+            poi_parts.append(self.poi_order[sorted_idx[kept]])
+            distance_parts.append(distances)
         
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Spatial index built with {len(self.poi_spatial_index)} grid cells")
+        if not point_parts:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0)
+        return np.concatenate(point_parts), np.concatenate(poi_parts), np.concatenate(distance_parts)
     
     def _validate_route_edge_usage(self, route: List[int], max_edge_usage: int = 2) -> bool:
         """Check if route respects maximum edge usage constraint"""
-        edge_usage = {}
+        edge_usage = defaultdict(int)
         
         for i in range(len(route) - 1):
             u, v = route[i], route[i + 1]
             # Create canonical edge representation (smaller node first)
             edge = (min(u, v), max(u, v))
-            edge_usage[edge] = edge_usage.get(edge, 0) + 1
+            edge_usage[edge] += 1
             
             if edge_usage[edge] > max_edge_usage:
                 return False
@@ -103,114 +320,199 @@ class POIRoutingEngine:
     
     def _get_route_edge_usage(self, route: List[int]) -> Dict[Tuple[int, int], int]:
         """Get edge usage count for a route"""
-        edge_usage = {}
+        edge_usage = defaultdict(int)
         
         for i in range(len(route) - 1):
             u, v = route[i], route[i + 1]
             # Create canonical edge representation (smaller node first)
             edge = (min(u, v), max(u, v))
-            edge_usage[edge] = edge_usage.get(edge, 0) + 1
+            edge_usage[edge] += 1
         
         return edge_usage
     
+    def _shortest_path(self, source: int, target: int, weight: str = 'length',
+                       limit: float = math.inf) -> List[int]:
+        """Shortest path between two nodes, using SciPy's Dijkstra on the CSR graph
+        
+        limit is an upper bound on the path cost (e.g. the cost of an already known
+        path); nodes farther away than that are never explored.
+        """
+        return self._tree_path(self._shortest_path_tree(source, weight, limit), source, target)
+    
+    def _shortest_path_tree(self, source: int, weight: str = 'length', limit: float = math.inf) -> np.ndarray:
+        """Dijkstra predecessor array from source, for reading off paths with _tree_path"""
+        return dijkstra(self.weight_csr[weight], directed=True, indices=self.id_to_idx[source],
+                        return_predecessors=True, limit=limit * (1 + 1e-9))[1]
+    
+    def _tree_path(self, predecessors: np.ndarray, source: int, target: int) -> List[int]:
+        """Walk a shortest-path tree from target back to its source"""
+        source_idx, target_idx = self.id_to_idx[source], self.id_to_idx[target]
+        if target_idx != source_idx and predecessors[target_idx] < 0:
+            raise nx.NetworkXNoPath(f"No path between {source} and {target}")
+        
+        path = [target_idx]
+        while path[-1] != source_idx:
+            path.append(int(predecessors[path[-1]]))
+        return [self.node_ids[i] for i in reversed(path)]
+    
+    def _route_weight(self, route: List[int], weight: str) -> float:
+        """Sum of an edge weight along a route, read from this engine's CSR matrices"""
+        route_idx = [self.id_to_idx[node] for node in route]
+        if len(route_idx) < 2:
+            return 0.0
+        return sum(np.asarray(self.weight_csr[weight][route_idx[:-1], route_idx[1:]]).ravel().tolist())
+    
+    def _start_end_distances(self, start_node: int, end_node: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Shortest 'length' distances from start_node to every node and from every node to end_node"""
+        length_csr = self.weight_csr['length']
+        from_start = dijkstra(length_csr, directed=True, indices=self.id_to_idx[start_node])
+        to_end = dijkstra(length_csr.T.tocsr(), directed=True, indices=self.id_to_idx[end_node])
+        return from_start, to_end
+    
+    def _via_distance(self, from_start: np.ndarray, to_end: np.ndarray, node: int) -> float:
+        """Length of the shortest start -> node -> end walk from precomputed distances"""
+        node_idx = self.id_to_idx[node]
+        if not (np.isfinite(from_start[node_idx]) and np.isfinite(to_end[node_idx])):
+            raise nx.NetworkXNoPath(f"Node {node} is not reachable between start and end")
+        return float(from_start[node_idx] + to_end[node_idx])
+    
     def _calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-        """Calculate distance between two points in meters"""
-        R = 6371000  # Earth's radius in meters
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lng = math.radians(lng2 - lng1)
-        
-        a = (math.sin(delta_lat/2) ** 2 + 
-             math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lng/2) ** 2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        return R * c
+        """Calculate distance between two points in meters
+
+        Scalar counterpart of _haversine_within, kept for single-pair rechecks;
+        batched callers go through the vectorized kernel instead.
+        """
+        sin, cos, radians = math.sin, math.cos, math.radians
+        a = (sin(radians(lat2 - lat1) / 2) ** 2 +
+             cos(radians(lat1)) * cos(radians(lat2)) * sin(radians(lng2 - lng1) / 2) ** 2)
+        return EARTH_RADIUS_M * (2 * math.atan2(math.sqrt(a), math.sqrt(1 - a)))
     
-    def _find_pois_near_edge(self, u: int, v: int, radius: float = 50.0) -> List[dict]:
-        """Find POIs within radius of an edge"""
-        if u not in self.graph.nodes or v not in self.graph.nodes:
-            return []
+    def _nodes_near(self, lat: float, lng: float, radius: float) -> List[int]:
+        """Graph nodes within radius meters of a point, in graph node order"""
+        idx, _ = _haversine_within(lat, lng, self.node_xy[:, 1], self.node_xy[:, 0], radius * (1 + 1e-9))
+        # Confirm the few survivors with the scalar formula so the cut-off is exactly _calculate_distance's
+        return [self.node_ids[i] for i, (node_lng, node_lat) in zip(idx.tolist(), self.node_xy[idx].tolist())
+                if self._calculate_distance(lat, lng, node_lat, node_lng) <= radius]
+    
+    def _find_pois_near_edge(self, u: int, v: int, radius: float = 50.0) -> List[Tuple[int, float]]:
+        """Find POIs within radius of an edge as (index into self.pois, distance) pairs
         
-        u_data = self.graph.nodes[u]
-        v_data = self.graph.nodes[v]
+        No POI records are copied; use _find_pois_near_point for decorated dicts.
+        """
+        if u not in self.id_to_idx or v not in self.id_to_idx:
+            return []
         
         # Use midpoint of edge
-        mid_lat = (u_data['y'] + v_data['y']) / 2
-        mid_lng = (u_data['x'] + v_data['x']) / 2
+        mid_lng, mid_lat = 0.5 * (self.node_xy[self.id_to_idx[u]] + self.node_xy[self.id_to_idx[v]])
+        poi_idx, distances = self._nearby_poi_indices(mid_lat, mid_lng, radius)
+        return list(zip(poi_idx.tolist(), distances.tolist()))
+    
+    def _find_pois_near_point(self, lat: float, lng: float, radius: float = 50.0) -> List[dict]:
+        """Find POIs within radius of a point"""
+        poi_idx, distances = self._nearby_poi_indices(lat, lng, radius)
         
         nearby_pois = []
-        grid_size = 0.001
-        
-        # Check surrounding grid cells
-        for dlat in [-1, 0, 1]:
-            for dlng in [-1, 0, 1]:
-                grid_lat = int(mid_lat / grid_size) + dlat
-                grid_lng = int(mid_lng / grid_size) + dlng
-                grid_key = (grid_lat, grid_lng)
-                
-                if grid_key in self.poi_spatial_index:
-                    for poi in self.poi_spatial_index[grid_key]:
-                        distance = self._calculate_distance(mid_lat, mid_lng, poi['lat'], poi['lng'])
-                        if distance <= radius:
-                            poi_copy = poi.copy()
-                            poi_copy['distance_to_edge'] = distance
-                            nearby_pois.append(poi_copy)
+        for i, distance in zip(poi_idx.tolist(), distances.tolist()):
+            poi_copy = self.pois[i].copy()
+            poi_copy['distance_to_edge'] = distance
+            nearby_pois.append(poi_copy)
         
         return nearby_pois
     
+    def _nearby_poi_indices(self, lat: float, lng: float, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices of and distances to the POIs within radius of a point"""
+        # One vectorized haversine over every candidate in the 3x3 block
+        candidates = self._candidate_pois(lat, lng)
+        kept, distances = _haversine_within(lat, lng, self.poi_lat[candidates], self.poi_lng[candidates], radius)
+        return candidates[kept], distances
+    
+    def _node_poi_indices(self, node: int, radius: float) -> Tuple[Tuple[int, ...], Tuple[float, ...]]:
+        """Memoized _nearby_poi_indices around a graph node, as immutable tuples
+        
+        The graph and POIs never change after loading, so the waypoint searches can
+        share lookups across candidates and across calls.
+        """
+        cached = self._node_poi_cache.get((node, radius))
+        if cached is None:
+            lng, lat = self.node_xy[self.id_to_idx[node]]
+            poi_idx, distances = self._nearby_poi_indices(lat, lng, radius)
+            cached = self._node_poi_cache[node, radius] = (tuple(poi_idx.tolist()), tuple(distances.tolist()))
+        return cached
+    
+    def _edge_category_bonus(self, radius: float) -> Tuple[np.ndarray, int, int]:
+        """Per-category POI influence on every edge, independent of the preferences
+        
+        Returns an (edges x categories) matrix of summed distance factors for the POIs
+        within radius of each edge midpoint (the last column holds filtered-out POIs),
+        plus the number of edges with any POI nearby and of edge/viewpoint pairs.
+        Cached per radius, so apply_poi_weights only needs one matrix-vector product.
+        """
+        cached = self._bonus_cache.get(radius)
+        if cached is not None:
+            return cached
+        
+        edge_count = len(self.edge_data)
+        n_codes = len(CATEGORY_NAMES)
+        edge_mid = 0.5 * (self.node_xy[self.edge_uv[:, 0]] + self.node_xy[self.edge_uv[:, 1]])
+        edge_idx, poi_idx, distances = self._poi_pairs(edge_mid[:, 1], edge_mid[:, 0], radius)
+        
+        # Distance-based influence (closer = more influence)
+        codes = self.poi_category[poi_idx].astype(np.intp) % n_codes
+        distance_factor = 1 - (distances / radius)
+        category_bonus = np.bincount(edge_idx * n_codes + codes, weights=distance_factor,
+                                     minlength=edge_count * n_codes).reshape(edge_count, n_codes)
+        category_bonus.flags.writeable = False
+        
+        influenced_edges = np.count_nonzero(np.bincount(edge_idx, minlength=edge_count))
+        viewpoint_pairs = np.count_nonzero(codes == CATEGORY_TO_ID['viewpoints'])
+        self._bonus_cache[radius] = category_bonus, influenced_edges, viewpoint_pairs
+        return self._bonus_cache[radius]
+    
     def _categorize_poi(self, poi: dict) -> str:
         """Categorize POI based on attributes"""
         attrs = poi.get('attributes', {})
+        amenity = attrs.get('amenity')
+        natural = attrs.get('natural')
         
         # Food categories
-        if attrs.get('amenity') == 'restaurant':
-            return 'restaurants'
-        elif attrs.get('amenity') == 'fast_food':
-            return 'fast_food'
-        elif attrs.get('amenity') == 'cafe':
-            return 'cafes'
-        elif attrs.get('amenity') in ['bar', 'pub']:
-            return 'bars_pubs'
+        category = FOOD_AMENITY_CATEGORY.get(amenity)
+        if category:
+            return category
         
         # Nature categories
-        elif (attrs.get('natural') in ['tree', 'water', 'park'] or 
-              attrs.get('landuse') in ['forest', 'grass', 'garden'] or
-              attrs.get('leisure') in ['garden']):
+        if natural in NATURE_NATURAL or attrs.get('landuse') in NATURE_LANDUSE:
             return 'nature'
         
-        # Recreation & Sports
-        elif attrs.get('leisure') in ['park', 'playground', 'sports_centre', 'pitch']:
-            return 'recreation'
+        # Nature & Recreation by leisure type
+        category = LEISURE_CATEGORY.get(attrs.get('leisure'))
+        if category:
+            return category
         
         # Shopping
-        elif attrs.get('shop'):
+        if attrs.get('shop'):
             return 'shops'
         
         # Viewpoints (high priority for nature routes)
-        elif (attrs.get('tourism') == 'viewpoint' or 
-              attrs.get('natural') in ['peak', 'summit'] or
-              'viewpoint' in str(attrs.get('type', '')).lower() or
-              'peak' in str(attrs.get('type', '')).lower()):
+        poi_type = str(attrs.get('type', '')).lower()
+        if (attrs.get('tourism') == 'viewpoint' or natural in VIEWPOINT_NATURAL or
+                'viewpoint' in poi_type or 'peak' in poi_type):
             return 'viewpoints'
         
         # Tourism & Culture
-        elif (attrs.get('tourism') in ['attraction', 'museum', 'gallery', 'monument'] or
-              attrs.get('historic') or
-              attrs.get('amenity') in ['theatre', 'cinema', 'arts_centre']):
+        if attrs.get('tourism') in TOURISM_TOURISM or attrs.get('historic'):
             return 'tourism'
         
-        # Education
-        elif attrs.get('amenity') in ['school', 'university', 'college', 'library']:
-            return 'education'
+        # Cultural, educational and transport amenities
+        category = LATE_AMENITY_CATEGORY.get(amenity)
+        if category:
+            return category
         
         # Transportation
-        elif (attrs.get('amenity') in ['bicycle_parking', 'parking_space', 'bicycle_rental'] or
-              attrs.get('highway') in ['bus_stop'] or
-              attrs.get('public_transport')):
+        if attrs.get('highway') == 'bus_stop' or attrs.get('public_transport'):
             return 'transport'
         
         # Urban amenities (useful but not destination-worthy)
-        elif attrs.get('amenity') in ['bench', 'waste_basket', 'toilets', 'atm']:
+        if amenity in IGNORED_AMENITY:
             return None  # Filter out - not useful for routing preferences
         
         # Default - keep minimal 'other' for truly unclassified
@@ -220,59 +522,42 @@ class POIRoutingEngine:
         """Apply POI-based weights to graph edges"""
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Applying POI weights with {influence_radius}m radius...")
         
-        edge_count = 0
-        poi_influenced_edges = 0
+        edge_count = len(self.edge_data)
+        base_weight = self.edge_length
+        
+        # Apply path type penalties/bonuses for nature routes
+        path_multiplier = np.ones(edge_count)
+        if prefer_nature_paths:
+            # Heavily favor natural paths
+            path_multiplier = PATH_MULT_NATURE[self.edge_highway_code]
+        
+        # Per-category POI influence of every edge (cached per radius across calls)
+        category_bonus, poi_influenced_edges, viewpoint_pairs = self._edge_category_bonus(influence_radius)
+        
+        # Dense preference vector indexed by category code; the trailing slot stays
+        # zero for the code -1 of filtered-out POIs, as do unwanted categories
+        pref_vec = np.zeros(len(CATEGORY_NAMES))
+        for category, value in poi_preferences.items():
+            if category in CATEGORY_TO_ID:
+                pref_vec[CATEGORY_TO_ID[category]] = value
+        poi_bonus = category_bonus @ pref_vec
+        
+        # Track viewpoint influences
         viewpoint_influenced_edges = 0
+        if 'viewpoints' in poi_preferences:
+            viewpoint_influenced_edges = viewpoint_pairs
         
-        for u, v, data in self.graph.edges(data=True):
-            base_weight = data.get('length', 100)
-            poi_bonus = 0
-            
-            # Apply path type penalties/bonuses for nature routes
-            path_multiplier = 1.0
-            if prefer_nature_paths:
-                highway_type = data.get('highway', '')
-                if isinstance(highway_type, list):
-                    highway_type = highway_type[0] if highway_type else ''
-                
-                # Heavily favor natural paths
-                if highway_type in ['path', 'footway', 'track', 'bridleway']:
-                    path_multiplier = 0.3  # Much more attractive
-                elif highway_type in ['cycleway', 'pedestrian']:
-                    path_multiplier = 0.5  # Moderately attractive
-                elif highway_type in ['residential', 'living_street']:
-                    path_multiplier = 1.5  # Slightly less attractive
-                elif highway_type in ['primary', 'secondary', 'tertiary', 'trunk']:
-                    path_multiplier = 3.0  # Much less attractive (avoid main roads)
-                else:
-                    path_multiplier = 2.0  # Default penalty for other roads
-            
-            # Find nearby POIs
-            nearby_pois = self._find_pois_near_edge(u, v, influence_radius)
-            
-            if nearby_pois:
-                poi_influenced_edges += 1
-                
-                for poi in nearby_pois:
-                    category = self._categorize_poi(poi)
-                    if category and category in poi_preferences:  # Skip None categories
-                        # Distance-based influence (closer = more influence)
-                        distance_factor = 1 - (poi['distance_to_edge'] / influence_radius)
-                        poi_value = poi_preferences[category] * distance_factor
-                        poi_bonus += poi_value
-                        
-                        # Track viewpoint influences
-                        if category == 'viewpoints':
-                            viewpoint_influenced_edges += 1
-            
-            # Apply POI bonus (lower weight = more attractive)
-            # Use logarithmic scaling to prevent extreme weights
-            poi_multiplier = 1 / (1 + math.log(1 + poi_bonus))
-            data['poi_weight'] = base_weight * poi_multiplier * path_multiplier
-            data['poi_bonus'] = poi_bonus
-            data['path_multiplier'] = path_multiplier
-            
-            edge_count += 1
+        # Apply POI bonus (lower weight = more attractive)
+        # Use logarithmic scaling to prevent extreme weights
+        poi_multiplier = 1 / (1 + np.log1p(poi_bonus))
+        poi_weight = base_weight * poi_multiplier * path_multiplier
+        self.weight_csr['poi_weight'] = self._edge_csr(poi_weight)
+        
+        for data, weight, bonus, multiplier in zip(self.edge_data, poi_weight.tolist(), poi_bonus.tolist(),
+                                                   path_multiplier.tolist()):
+            data['poi_weight'] = weight
+            data['poi_bonus'] = bonus
+            data['path_multiplier'] = multiplier
         
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Applied weights to {edge_count} edges, {poi_influenced_edges} influenced by POIs")
         if 'viewpoints' in poi_preferences:
@@ -313,8 +598,7 @@ class POIRoutingEngine:
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Deviation allowance: {deviation_factor*100:.0f}% of direct route")
         
         # Find nearest nodes
-        start_node = ox.distance.nearest_nodes(self.graph, X=start_lng, Y=start_lat, return_dist=False)
-        end_node = ox.distance.nearest_nodes(self.graph, X=end_lng, Y=end_lat, return_dist=False)
+        start_node, end_node = ox.distance.nearest_nodes(self.graph, X=[start_lng, end_lng], Y=[start_lat, end_lat]).tolist()
         
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Start node: {start_node}, End node: {end_node}")
         
@@ -325,7 +609,7 @@ class POIRoutingEngine:
         
         # Calculate direct route first to establish baseline
         try:
-            direct_route = nx.shortest_path(self.graph, start_node, end_node, weight='length')
+            direct_route = self._shortest_path(start_node, end_node, weight='length')
             direct_time = self.calculate_route_time(direct_route)
             direct_distance = sum(self.graph[direct_route[i]][direct_route[i+1]].get('length', 0) 
                                 for i in range(len(direct_route) - 1))
@@ -349,7 +633,9 @@ class POIRoutingEngine:
         
         # Try POI-optimized route first
         try:
-            poi_route = nx.shortest_path(self.graph, start_node, end_node, weight='poi_weight')
+            # The direct route is a feasible path, so its POI-weighted cost bounds the search
+            upper_bound = self._route_weight(direct_route, 'poi_weight')
+            poi_route = self._shortest_path(start_node, end_node, 'poi_weight', limit=upper_bound)
             poi_time = self.calculate_route_time(poi_route)
             poi_distance = sum(self.graph[poi_route[i]][poi_route[i+1]].get('length', 0) 
                              for i in range(len(poi_route) - 1))
@@ -413,22 +699,57 @@ class POIRoutingEngine:
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Finding route from ({start_lat:.6f}, {start_lng:.6f}) to ({end_lat:.6f}, {end_lng:.6f})")
         
         # Find nearest nodes
-        start_node = ox.distance.nearest_nodes(self.graph, X=start_lng, Y=start_lat, return_dist=False)
-        end_node = ox.distance.nearest_nodes(self.graph, X=end_lng, Y=end_lat, return_dist=False)
+        start_node, end_node = ox.distance.nearest_nodes(self.graph, X=[start_lng, end_lng], Y=[start_lat, end_lat]).tolist()
         
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Start node: {start_node}, End node: {end_node}")
         
+        # Repeated queries between the same nodes are answered from the cache
+        pref_items = tuple(sorted(poi_preferences.items())) if poi_preferences else ()
+        key = (start_node, end_node, pref_items, target_time_minutes, max_detour_factor)
+        cached = self._route_cache.get(key)
+        if cached is None:
+            cached = self._route_cache[key] = self._find_route_between(*key)
+        elif pref_items and start_node != end_node and 'error' not in cached:
+            # Leave the graph weighted for these preferences, as a fresh search would
+            self._apply_route_weights(dict(pref_items))
+        
+        # Callers get their own copy, stamped for this call
+        result = copy.deepcopy(cached)
+        if 'metadata' in result:
+            result['metadata']['generated_at'] = self.generated_at or datetime.now().isoformat()
+        return result
+    
+    def _direct_route(self, start_node: int, end_node: int) -> Tuple[Tuple[int, ...], float, float]:
+        """Shortest route by length with its time and distance, memoized per node pair"""
+        cached = self._direct_route_cache.get((start_node, end_node))
+        if cached is None:
+            route = self._shortest_path(start_node, end_node, weight='length')
+            time = self.calculate_route_time(route)
+            distance = sum(self.graph[route[i]][route[i+1]].get('length', 0) for i in range(len(route) - 1))
+            cached = self._direct_route_cache[start_node, end_node] = (tuple(route), time, distance)
+        return cached
+    
+    def _apply_route_weights(self, poi_preferences: Dict[str, float]):
+        """Apply POI weights the way find_route does for a preference set"""
+        # Nature path preference for routes with nature/viewpoint preferences
+        prefer_paths = 'nature' in poi_preferences or 'viewpoints' in poi_preferences
+        influence_radius = 100.0 if 'viewpoints' in poi_preferences else 50.0  # Larger radius for viewpoint routes
+        self.apply_poi_weights(poi_preferences, influence_radius=influence_radius, prefer_nature_paths=prefer_paths)
+    
+    def _find_route_between(self, start_node: int, end_node: int, pref_items: Tuple[Tuple[str, float], ...],
+                            target_time_minutes: Optional[float], max_detour_factor: float) -> Dict:
+        """find_route for snapped nodes; find_route caches the results"""
+        poi_preferences = dict(pref_items)
+        
         # Early exit if start and end are the same node
         if start_node == end_node:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Start and end nodes are identical - returning minimal route")
             return self._format_route_result([start_node], 'same_location', 0.0, 0.0, [])
         
-        # Calculate direct route first
+        # Calculate direct route first (shared by every preference set between these nodes)
         try:
-            direct_route = nx.shortest_path(self.graph, start_node, end_node, weight='length')
-            direct_time = self.calculate_route_time(direct_route)
-            direct_distance = sum(self.graph[direct_route[i]][direct_route[i+1]].get('length', 0) 
-                                for i in range(len(direct_route) - 1))
+            direct_route, direct_time, direct_distance = self._direct_route(start_node, end_node)
+            direct_route = list(direct_route)
         except nx.NetworkXNoPath:
             return {'error': 'No route found between start and end points'}
         
@@ -438,14 +759,13 @@ class POIRoutingEngine:
         if not poi_preferences:
             return self._format_route_result(direct_route, 'direct', direct_time, direct_distance, [])
         
-        # Apply POI weights (with nature path preference for routes with nature/viewpoint preferences)
-        prefer_paths = poi_preferences and ('nature' in poi_preferences or 'viewpoints' in poi_preferences)
-        influence_radius = 100.0 if 'viewpoints' in poi_preferences else 50.0  # Larger radius for viewpoint routes
-        self.apply_poi_weights(poi_preferences, influence_radius=influence_radius, prefer_nature_paths=prefer_paths)
+        self._apply_route_weights(poi_preferences)
         
         # Calculate POI-optimized route
         try:
-            poi_route = nx.shortest_path(self.graph, start_node, end_node, weight='poi_weight')
+            # The direct route is a feasible path, so its POI-weighted cost bounds the search
+            upper_bound = self._route_weight(direct_route, 'poi_weight')
+            poi_route = self._shortest_path(start_node, end_node, 'poi_weight', limit=upper_bound)
             poi_time = self.calculate_route_time(poi_route)
             poi_distance = sum(self.graph[poi_route[i]][poi_route[i+1]].get('length', 0) 
                              for i in range(len(poi_route) - 1))
@@ -543,7 +863,7 @@ class POIRoutingEngine:
                                 poi_preferences: Dict[str, float]) -> Optional[Dict]:
         """Find route that fills target time by adding strategic detours"""
         # This is a simplified implementation - could be much more sophisticated
-        direct_route = nx.shortest_path(self.graph, start_node, end_node, weight='length')
+        direct_route = self._shortest_path(start_node, end_node, weight='length')
         direct_time = self.calculate_route_time(direct_route)
         
         if direct_time >= target_time:
@@ -567,25 +887,21 @@ class POIRoutingEngine:
         nodes_checked = 0
         max_nodes_to_check = 100  # Reduced to prevent timeout
         
-        for node in self.graph.nodes():
+        # Distances from start and to end for every node, one Dijkstra each
+        from_start, to_end = self._start_end_distances(start_node, end_node)
+        direct_dist = self._via_distance(from_start, to_end, end_node)
+        
+        # Quick distance filter over all nodes at once, to avoid expensive path calculations
+        for node in self._nodes_near(mid_lat, mid_lng, max_search_distance):
             if node == start_node or node == end_node:
                 continue
             
-            # Quick distance filter to avoid expensive path calculations
-            node_data = self.graph.nodes[node]
-            distance_to_mid = self._calculate_distance(mid_lat, mid_lng, node_data['y'], node_data['x'])
-            
-            if distance_to_mid > max_search_distance:
-                continue
-            
             nodes_checked += 1
             if nodes_checked > max_nodes_to_check:
                 break
             
             try:
-                detour_dist = (nx.shortest_path_length(self.graph, start_node, node, weight='length') +
-                              nx.shortest_path_length(self.graph, node, end_node, weight='length'))
-                direct_dist = nx.shortest_path_length(self.graph, start_node, end_node, weight='length')
+                detour_dist = self._via_distance(from_start, to_end, node)
                 
                 if detour_dist <= direct_dist * 3.5:  # Allow longer detours for time filling
                     # Calculate POI score for this node
@@ -611,8 +927,8 @@ class POIRoutingEngine:
         # Try multiple waypoints to find best time match
         for waypoint in candidate_waypoints[:5]:  # Try top 5 candidates to avoid timeout
             try:
-                waypoint_route = (nx.shortest_path(self.graph, start_node, waypoint['node'], weight='poi_weight') +
-                                 nx.shortest_path(self.graph, waypoint['node'], end_node, weight='poi_weight')[1:])
+                waypoint_route = (self._shortest_path(start_node, waypoint['node'], weight='poi_weight') +
+                                 self._shortest_path(waypoint['node'], end_node, weight='poi_weight')[1:])
                 
                 waypoint_time = self.calculate_route_time(waypoint_route)
                 waypoint_distance = sum(self.graph[waypoint_route[i]][waypoint_route[i+1]].get('length', 0) 
@@ -646,12 +962,12 @@ class POIRoutingEngine:
         # Find all viewpoints within reasonable distance
         viewpoint_pois = []
         ramberget_found = False
-        for poi in self.pois:
+        for poi_i, poi in enumerate(self.pois):
             if 'lat' not in poi or 'lng' not in poi:
                 continue
             category = self._categorize_poi(poi)
             if category == 'viewpoints':
-                viewpoint_pois.append(poi)
+                viewpoint_pois.append((poi_i, poi))
                 poi_name = poi.get('attributes', {}).get('name', 'Unnamed')
                 if poi_name == 'Ramberget':
                     ramberget_found = True
@@ -665,19 +981,20 @@ class POIRoutingEngine:
             
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Found {len(viewpoint_pois)} total viewpoints")
         
+        # Distances from start and to end for every node, one Dijkstra each
+        from_start, to_end = self._start_end_distances(start_node, end_node)
+        direct_dist = self._via_distance(from_start, to_end, end_node)
+        
         # Find nearest nodes for each viewpoint
         viewpoint_nodes = []
         ramberget_processed = False
-        for poi in viewpoint_pois:
+        for poi_i, poi in viewpoint_pois:
             poi_name = poi.get('attributes', {}).get('name', 'Unnamed')
             try:
-                nearest_node = ox.distance.nearest_nodes(self.graph, X=poi['lng'], Y=poi['lat'], return_dist=False)
+                nearest_node = self.poi_nearest_node[poi_i]
                 # Check if viewpoint is reachable
                 try:
-                    dist_from_start = nx.shortest_path_length(self.graph, start_node, nearest_node, weight='length')
-                    dist_to_end = nx.shortest_path_length(self.graph, nearest_node, end_node, weight='length')
-                    total_dist = dist_from_start + dist_to_end
-                    direct_dist = nx.shortest_path_length(self.graph, start_node, end_node, weight='length')
+                    total_dist = self._via_distance(from_start, to_end, nearest_node)
                     
                     detour_factor = total_dist / direct_dist
                     
@@ -753,9 +1070,16 @@ class POIRoutingEngine:
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] FOUND Ramberget at position {i+1}/{len(viewpoint_nodes)}: detour {vp['detour_cost']:.0f}m")
                     break
         
-        # Try to build routes through multiple viewpoints
+        # Try to build routes through multiple viewpoints. Consecutive attempts share
+        # most of their segments, so keep one shortest-path tree per segment source.
         best_route = None
         best_viewpoint_count = 0
+        segment_trees = {}
+        
+        def segment_path(source, target):
+            if source not in segment_trees:
+                segment_trees[source] = self._shortest_path_tree(source, weight='poi_weight')
+            return self._tree_path(segment_trees[source], source, target)
         
         # Try different combinations of viewpoints (maximize viewpoints, no arbitrary limit)
         for num_viewpoints in range(len(viewpoint_nodes), 0, -1):  # Try all viewpoints down to 1
@@ -772,7 +1096,7 @@ class POIRoutingEngine:
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] Building route through: {planned_names}")
                     
                     for vp in selected_viewpoints:
-                        segment = nx.shortest_path(self.graph, current_node, vp['node'], weight='poi_weight')
+                        segment = segment_path(current_node, vp['node'])
                         if len(route_segments) > 0:
                             segment = segment[1:]  # Remove duplicate node
                         route_segments.extend(segment)
@@ -785,7 +1109,7 @@ class POIRoutingEngine:
                             print(f"[{datetime.now().strftime('%H:%M:%S')}] Ramberget node in route_segments: {vp['node'] in route_segments}")
                     
                     # Add final segment to end
-                    final_segment = nx.shortest_path(self.graph, current_node, end_node, weight='poi_weight')
+                    final_segment = segment_path(current_node, end_node)
                     if len(route_segments) > 0:
                         final_segment = final_segment[1:]  # Remove duplicate node
                     route_segments.extend(final_segment)
@@ -883,7 +1207,7 @@ class POIRoutingEngine:
     def _find_trail_with_waypoints(self, start_node: int, end_node: int, max_allowed_distance: float, 
                                   poi_preferences: Dict[str, float]) -> Optional[Dict]:
         """Find trail within distance constraints by adding strategic waypoints"""
-        direct_route = nx.shortest_path(self.graph, start_node, end_node, weight='length')
+        direct_route = self._shortest_path(start_node, end_node, weight='length')
         direct_distance = sum(self.graph[direct_route[i]][direct_route[i+1]].get('length', 0) 
                             for i in range(len(direct_route) - 1))
         
@@ -907,24 +1231,20 @@ class POIRoutingEngine:
         nodes_checked = 0
         max_nodes_to_check = 50  # Reduced for trail generation
         
-        for node in self.graph.nodes():
+        # Distances from start and to end for every node, one Dijkstra each
+        from_start, to_end = self._start_end_distances(start_node, end_node)
+        
+        # Quick distance filter over all nodes at once
+        for node in self._nodes_near(mid_lat, mid_lng, max_search_distance):
             if node == start_node or node == end_node:
                 continue
             
-            # Quick distance filter
-            node_data = self.graph.nodes[node]
-            distance_to_mid = self._calculate_distance(mid_lat, mid_lng, node_data['y'], node_data['x'])
-            
-            if distance_to_mid > max_search_distance:
-                continue
-            
             nodes_checked += 1
             if nodes_checked > max_nodes_to_check:
                 break
             
             try:
-                detour_dist = (nx.shortest_path_length(self.graph, start_node, node, weight='length') +
-                              nx.shortest_path_length(self.graph, node, end_node, weight='length'))
+                detour_dist = self._via_distance(from_start, to_end, node)
                 
                 if detour_dist <= max_allowed_distance:
                     # Calculate POI score for this node
@@ -947,8 +1267,8 @@ class POIRoutingEngine:
         
         for waypoint in candidate_waypoints[:3]:  # Try top 3 candidates
             try:
-                waypoint_route = (nx.shortest_path(self.graph, start_node, waypoint['node'], weight='poi_weight') +
-                                 nx.shortest_path(self.graph, waypoint['node'], end_node, weight='poi_weight')[1:])
+                waypoint_route = (self._shortest_path(start_node, waypoint['node'], weight='poi_weight') +
+                                 self._shortest_path(waypoint['node'], end_node, weight='poi_weight')[1:])
                 
                 waypoint_time = self.calculate_route_time(waypoint_route)
                 waypoint_distance = sum(self.graph[waypoint_route[i]][waypoint_route[i+1]].get('length', 0) 
@@ -971,33 +1291,35 @@ class POIRoutingEngine:
         """Aggressively seek viewpoints within distance constraints"""
         # Find all viewpoints within reasonable distance
         viewpoint_pois = []
-        for poi in self.pois:
+        for poi_i, poi in enumerate(self.pois):
             if 'lat' not in poi or 'lng' not in poi:
                 continue
             category = self._categorize_poi(poi)
             if category == 'viewpoints':
-                viewpoint_pois.append(poi)
+                viewpoint_pois.append((poi_i, poi))
         
         if not viewpoint_pois:
             return None
             
+        # Distances from start and to end for every node, one Dijkstra each
+        from_start, to_end = self._start_end_distances(start_node, end_node)
+        direct_dist = self._via_distance(from_start, to_end, end_node)
+        
         # Find nearest nodes for each viewpoint
         viewpoint_nodes = []
-        for poi in viewpoint_pois:
+        for poi_i, poi in viewpoint_pois:
             try:
-                nearest_node = ox.distance.nearest_nodes(self.graph, X=poi['lng'], Y=poi['lat'], return_dist=False)
+                nearest_node = self.poi_nearest_node[poi_i]
                 # Check if viewpoint is reachable within distance constraints
                 try:
-                    dist_from_start = nx.shortest_path_length(self.graph, start_node, nearest_node, weight='length')
-                    dist_to_end = nx.shortest_path_length(self.graph, nearest_node, end_node, weight='length')
-                    total_dist = dist_from_start + dist_to_end
+                    total_dist = self._via_distance(from_start, to_end, nearest_node)
                     
                     # Only consider viewpoints that fit within deviation limit
                     if total_dist <= max_allowed_distance:
                         viewpoint_nodes.append({
                             'node': nearest_node,
                             'poi': poi,
-                            'detour_cost': total_dist - nx.shortest_path_length(self.graph, start_node, end_node, weight='length'),
+                            'detour_cost': total_dist - direct_dist,
                             'total_dist': total_dist
                         })
                 except nx.NetworkXNoPath:
@@ -1039,14 +1361,14 @@ class POIRoutingEngine:
                     current_node = start_node
                     
                     for vp in selected_viewpoints:
-                        segment = nx.shortest_path(self.graph, current_node, vp['node'], weight='poi_weight')
+                        segment = self._shortest_path(current_node, vp['node'], weight='poi_weight')
                         if len(route_segments) > 0:
                             segment = segment[1:]  # Remove duplicate node
                         route_segments.extend(segment)
                         current_node = vp['node']
                     
                     # Add final segment to end
-                    final_segment = nx.shortest_path(self.graph, current_node, end_node, weight='poi_weight')
+                    final_segment = self._shortest_path(current_node, end_node, weight='poi_weight')
                     if len(route_segments) > 0:
                         final_segment = final_segment[1:]  # Remove duplicate node
                     route_segments.extend(final_segment)
@@ -1083,30 +1405,31 @@ class POIRoutingEngine:
         """Aggressively seek POIs by building route through multiple high-priority POIs"""
         # Find all POIs matching the preferred categories
         category_pois = []
-        for poi in self.pois:
+        for poi_i, poi in enumerate(self.pois):
             if 'lat' not in poi or 'lng' not in poi:
                 continue
             category = self._categorize_poi(poi)
             if category and category in poi_preferences and poi_preferences[category] >= 10.0:  # Only high-priority categories
-                category_pois.append(poi)
+                category_pois.append((poi_i, poi))
         
         if not category_pois:
             return None
             
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Found {len(category_pois)} high-priority POIs for aggressive routing")
         
+        # Distances from start and to end for every node, one Dijkstra each
+        from_start, to_end = self._start_end_distances(start_node, end_node)
+        direct_dist = self._via_distance(from_start, to_end, end_node)
+        
         # Find nearest nodes for each POI
         poi_nodes = []
-        for poi in category_pois:
+        for poi_i, poi in category_pois:
             poi_name = poi.get('attributes', {}).get('name', 'Unnamed')
             try:
-                nearest_node = ox.distance.nearest_nodes(self.graph, X=poi['lng'], Y=poi['lat'], return_dist=False)
+                nearest_node = self.poi_nearest_node[poi_i]
                 # Check if POI is reachable
                 try:
-                    dist_from_start = nx.shortest_path_length(self.graph, start_node, nearest_node, weight='length')
-                    dist_to_end = nx.shortest_path_length(self.graph, nearest_node, end_node, weight='length')
-                    total_dist = dist_from_start + dist_to_end
-                    direct_dist = nx.shortest_path_length(self.graph, start_node, end_node, weight='length')
+                    total_dist = self._via_distance(from_start, to_end, nearest_node)
                     
                     detour_factor = total_dist / direct_dist
                     
@@ -1164,14 +1487,14 @@ class POIRoutingEngine:
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] Building aggressive route through {num_pois} POIs: {planned_names[:5]}{'...' if len(planned_names) > 5 else ''}")
                     
                     for pn in selected_pois:
-                        segment = nx.shortest_path(self.graph, current_node, pn['node'], weight='poi_weight')
+                        segment = self._shortest_path(current_node, pn['node'], weight='poi_weight')
                         if len(route_segments) > 0:
                             segment = segment[1:]  # Remove duplicate node
                         route_segments.extend(segment)
                         current_node = pn['node']
                     
                     # Add final segment to end
-                    final_segment = nx.shortest_path(self.graph, current_node, end_node, weight='poi_weight')
+                    final_segment = self._shortest_path(current_node, end_node, weight='poi_weight')
                     if len(route_segments) > 0:
                         final_segment = final_segment[1:]  # Remove duplicate node
                     route_segments.extend(final_segment)
@@ -1195,13 +1518,13 @@ class POIRoutingEngine:
                     
                     # Calculate route quality based on POI categories and preferences
                     quality_score = 0
-                    category_counts = {}
+                    category_counts = defaultdict(int)
                     for poi in route_pois:
                         category = poi.get('category')
                         if category and category in poi_preferences:
                             preference_value = poi_preferences[category]
                             quality_score += preference_value
-                            category_counts[category] = category_counts.get(category, 0) + 1
+                            category_counts[category] += 1
                     
                     total_preferred_pois = sum(category_counts.values())
                     
@@ -1227,83 +1550,94 @@ class POIRoutingEngine:
     
     def _calculate_node_poi_score(self, node: int, poi_preferences: Dict[str, float]) -> float:
         """Calculate POI score for a node based on nearby POIs"""
-        if node not in self.graph.nodes:
+        if node not in self.id_to_idx:
             return 0.0
         
-        node_data = self.graph.nodes[node]
-        nearby_pois = self._find_pois_near_edge(node, node, radius=100)  # Larger radius for waypoints
+        poi_idx, distances = self._node_poi_indices(node, 100)  # Larger radius for waypoints
         
         score = 0.0
-        for poi in nearby_pois:
-            category = self._categorize_poi(poi)
+        for code, distance in zip(self.poi_category[list(poi_idx)].tolist(), distances):
+            category = CATEGORY_NAMES[code]
             if category and category in poi_preferences:  # Skip None categories
-                distance_factor = 1 - (poi['distance_to_edge'] / 100)
+                distance_factor = 1 - (distance / 100)
                 score += poi_preferences[category] * distance_factor
         
         return score
     
     def _find_pois_along_route(self, route: List[int], radius: float = 100.0) -> List[Dict]:
         """Find POIs along the route"""
+        # Visit each distinct route node once, at its first position along the route
+        route_idx = np.array([self.id_to_idx.get(node, -1) for node in route], dtype=np.intp)
+        positions = np.flatnonzero(route_idx >= 0)
+        node_idx, first = np.unique(route_idx[positions], return_index=True)
+        positions = positions[first]
+        
+        # One batched search for all nodes, ordered by route position and then search order
+        point_idx, poi_idx, distances = self._poi_pairs(self.node_xy[node_idx, 1], self.node_xy[node_idx, 0], radius)
+        order = np.argsort(positions[point_idx], kind='stable')
+        point_idx, poi_idx, distances = point_idx[order], poi_idx[order], distances[order]
+        
+        # Skip None categories, then keep each POI where the route first passes it
+        keep = self.poi_category[poi_idx] >= 0
+        point_idx, poi_idx, distances = point_idx[keep], poi_idx[keep], distances[keep]
+        _, first = np.unique(poi_idx, return_index=True)
+        first.sort()
+        
         route_pois = []
         seen_pois = set()
-        
-        for i in range(len(route)):
-            node = route[i]
-            nearby_pois = self._find_pois_near_edge(node, node, radius)
-            
-            for poi in nearby_pois:
-                poi_id = poi.get('osm_id')
-                category = self._categorize_poi(poi)
-                if poi_id not in seen_pois and category:  # Skip None categories
-                    seen_pois.add(poi_id)
-                    poi_info = poi.copy()
-                    poi_info['category'] = category
-                    poi_info['route_segment'] = i
-                    route_pois.append(poi_info)
+        for poi_i, code, position, distance in zip(poi_idx[first].tolist(), self.poi_category[poi_idx[first]].tolist(),
+                                                   positions[point_idx[first]].tolist(), distances[first].tolist()):
+            poi = self.pois[poi_i]
+            poi_id = poi.get('osm_id')
+            if poi_id not in seen_pois:
+                seen_pois.add(poi_id)
+                poi_info = poi.copy()
+                poi_info['distance_to_edge'] = distance
+                poi_info['category'] = POI_CATEGORIES[code]
+                poi_info['route_segment'] = position
+                route_pois.append(poi_info)
         
         return route_pois
     
     def _format_route_result(self, route: List[int], route_type: str, time: float, 
                            distance: float, pois: List[Dict]) -> Dict:
         """Format route result with coordinates and metadata"""
-        coordinates = []
-        for node in route:
-            if node in self.graph.nodes:
-                node_data = self.graph.nodes[node]
-                coordinates.append({
-                    'lat': node_data['y'],
-                    'lng': node_data['x']
-                })
+        # One fancy-index into the node coordinate array instead of a graph lookup per node
+        node_idx = [i for i in map(self.id_to_idx.get, route) if i is not None]
+        coordinates = self.node_xy[node_idx][:, ::-1].tolist()  # [lat, lng] pairs
         
         # Categorize POIs
-        poi_summary = defaultdict(int)
-        for poi in pois:
-            poi_summary[poi['category']] += 1
+        poi_summary = Counter(poi['category'] for poi in pois)
         
         # Prioritize viewpoints in detailed POIs
         viewpoints = [poi for poi in pois if poi.get('category') == 'viewpoints']
-        other_pois = [poi for poi in pois if poi.get('category') != 'viewpoints']
-        detailed_pois = viewpoints + other_pois[:max(0, 20 - len(viewpoints))]
+        other_pois = islice((poi for poi in pois if poi.get('category') != 'viewpoints'), max(0, 20 - len(viewpoints)))
+        detailed_pois = viewpoints + list(other_pois)
         
         return {
             'route_type': route_type,
             'coordinates': coordinates,
             'nodes': route,
             'distance_meters': round(distance, 1),
+            'distance_m_int': round(distance),  # Whole meters, ready for display
             'time_minutes': round(time, 1),
             'waypoints': len(route),
             'pois_along_route': len(pois),
             'poi_categories': dict(poi_summary),
             'detailed_pois': detailed_pois,  # Prioritize viewpoints
             'metadata': {
-                'generated_at': datetime.now().isoformat(),
+                'generated_at': self.generated_at or datetime.now().isoformat(),
                 'algorithm': 'poi_weighted_shortest_path'
             }
         }
 
-def generate_html_visualization(routes: List[Dict], output_file: str):
-    """Generate HTML visualization for multiple routes"""
-    html_content = f"""
+# Static pieces of the page written by generate_html_visualization
+ROUTE_COLORS = ['#FF0000', '#00FF00', '#0000FF', '#FF00FF', '#00FFFF']
+# Shared map script, copied next to each generated page and cached by the browser
+ROUTES_VIZ_JS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'routes_viz.js')
+HTML_WRITE_BUFFER = 1 << 20  # Bytes gathered before each write to the HTML file
+
+_HTML_HEADER = """
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -1312,20 +1646,20 @@ def generate_html_visualization(routes: List[Dict], output_file: str):
     <title>Multi-Route POI Visualization</title>
     <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css" />
     <style>
-        body {{ font-family: Arial, sans-serif; margin: 0; padding: 20px; }}
-        #map {{ height: 70vh; width: 100%; margin-bottom: 20px; }}
-        .route-info {{ display: flex; flex-wrap: wrap; gap: 20px; }}
-        .route-card {{
+        body { font-family: Arial, sans-serif; margin: 0; padding: 20px; }
+        #map { height: 70vh; width: 100%; margin-bottom: 20px; }
+        .route-info { display: flex; flex-wrap: wrap; gap: 20px; }
+        .route-card {
             border: 2px solid #ddd;
             border-radius: 8px;
             padding: 15px;
             min-width: 300px;
             flex: 1;
-        }}
-        .route-title {{ font-size: 18px; font-weight: bold; margin-bottom: 10px; }}
-        .route-stats {{ margin-bottom: 10px; }}
-        .poi-categories {{ font-size: 14px; }}
-        .legend {{ 
+        }
+        .route-title { font-size: 18px; font-weight: bold; margin-bottom: 10px; }
+        .route-stats { margin-bottom: 10px; }
+        .poi-categories { font-size: 14px; }
+        .legend { 
             position: absolute; 
             top: 10px; 
             right: 10px; 
@@ -1334,7 +1668,7 @@ def generate_html_visualization(routes: List[Dict], output_file: str):
             border-radius: 5px; 
             box-shadow: 0 0 10px rgba(0,0,0,0.3);
             z-index: 1000;
-        }}
+        }
     </style>
 </head>
 <body>
@@ -1344,124 +1678,170 @@ def generate_html_visualization(routes: List[Dict], output_file: str):
     <div class="route-info">
 """
 
-    colors = ['#FF0000', '#00FF00', '#0000FF', '#FF00FF', '#00FFFF']
-    
-    for i, route in enumerate(routes):
-        color = colors[i % len(colors)]
-        html_content += f"""
+_ROUTE_CARD_TMPL = """
         <div class="route-card" style="border-color: {color};">
-            <div class="route-title" style="color: {color};">{route['name']}</div>
+            <div class="route-title" style="color: {color};">{name}</div>
             <div class="route-stats">
-                <strong>Distance:</strong> {route['result']['distance_meters']:.0f}m<br>
-                <strong>Time:</strong> {route['result']['time_minutes']:.1f} min<br>
-                <strong>POIs:</strong> {route['result']['pois_along_route']}
+                <strong>Distance:</strong> {distance_m_int}m<br>
+                <strong>Time:</strong> {time_minutes} min<br>
+                <strong>POIs:</strong> {pois_along_route}
             </div>
             <div class="poi-categories">
                 <strong>Categories:</strong><br>
 """
-        for category, count in route['result']['poi_categories'].items():
-            html_content += f"                • {category}: {count}<br>\\n"
-        
-        html_content += "            </div>\\n        </div>\\n"
 
-    html_content += """
+_POI_CATEGORY_TMPL = "                • {category}: {count}<br>\\n"
+
+_ROUTE_CARD_END = "            </div>\\n        </div>\\n"
+
+_HTML_SCRIPT = """
     </div>
 
     <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
     <script>
-        // Initialize map
-        var map = L.map('map');
-        
-        // Add OpenStreetMap tiles
-        L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
-            attribution: '© OpenStreetMap contributors'
-        }).addTo(map);
-        
-        var routes = """ + json.dumps([r['result'] for r in routes]) + """;
-        var routeNames = """ + json.dumps([r['name'] for r in routes]) + """;
-        var colors = """ + json.dumps(colors) + """;
-        
-        var allBounds = [];
-        
-        // Add routes to map
-        routes.forEach(function(route, index) {
-            var color = colors[index % colors.length];
-            var name = routeNames[index];
-            
-            if (route.coordinates && route.coordinates.length > 0) {
-                var latlngs = route.coordinates.map(coord => [coord.lat, coord.lng]);
-                
-                // Add route line
-                var polyline = L.polyline(latlngs, {
-                    color: color,
-                    weight: 4,
-                    opacity: 0.8
-                }).addTo(map);
-                
-                polyline.bindPopup('<b>' + name + '</b><br>' +
-                                 'Distance: ' + route.distance_meters.toFixed(0) + 'm<br>' +
-                                 'Time: ' + route.time_minutes.toFixed(1) + ' min');
-                
-                // Add start marker
-                if (latlngs.length > 0) {
-                    L.circleMarker(latlngs[0], {
-                        color: color,
-                        fillColor: color,
-                        fillOpacity: 0.8,
-                        radius: 8
-                    }).addTo(map).bindPopup('Start: ' + name);
-                }
-                
-                // Add end marker
-                if (latlngs.length > 1) {
-                    L.circleMarker(latlngs[latlngs.length - 1], {
-                        color: color,
-                        fillColor: 'white',
-                        fillOpacity: 0.8,
-                        radius: 6
-                    }).addTo(map).bindPopup('End: ' + name);
-                }
-                
-                // Collect bounds
-                latlngs.forEach(latlng => allBounds.push(latlng));
-            }
-        });
-        
-        // Fit map to show all routes
-        if (allBounds.length > 0) {
-            map.fitBounds(allBounds, {padding: [20, 20]});
-        }
-        
-        // Add legend
-        var legend = L.control({position: 'topright'});
-        legend.onAdd = function(map) {
-            var div = L.DomUtil.create('div', 'legend');
-            div.innerHTML = '<h4>Routes</h4>';
-            
-            routeNames.forEach(function(name, index) {
-                var color = colors[index % colors.length];
-                div.innerHTML += '<div><span style="color: ' + color + '; font-weight: bold;">■</span> ' + name + '</div>';
-            });
-            
-            return div;
-        };
-        legend.addTo(map);
+        var routes = """
+
+_HTML_FOOTER = """;
     </script>
+    <script src="routes_viz.js"></script>
 </body>
 </html>
 """
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+def _install_routes_viz(output_file: str):
+    """Copy routes_viz.js next to output_file unless an identical copy is already there"""
+    target = os.path.join(os.path.dirname(os.path.abspath(output_file)), 'routes_viz.js')
+    if not (os.path.exists(target) and filecmp.cmp(ROUTES_VIZ_JS, target, shallow=False)):
+        shutil.copyfile(ROUTES_VIZ_JS, target)
+
+def _write_json_array(f, items):
+    """Write a compact JSON array to a text file one element at a time
+    
+    json.dump on a file goes through the pure-Python encoder, while json.dumps
+    uses the C one. Encoding per element keeps the C encoder and still only
+    holds one element's text at a time; the file buffer batches the writes.
+    """
+    f.write('[')
+    for i, item in enumerate(items):
+        if i:
+            f.write(',')
+        f.write(json.dumps(item, separators=(',', ':')))
+    f.write(']')
+
+def generate_html_visualization(routes: List[Dict], output_file: str):
+    """Generate HTML visualization for multiple routes, written to the file as it is built"""
+    with open(output_file, 'w', encoding='utf-8', buffering=HTML_WRITE_BUFFER) as f:
+        f.write(_HTML_HEADER)
+
+        # Resolve each route's color once, for both the cards and the map script
+        route_colors = list(islice(cycle(ROUTE_COLORS), len(routes)))
+        results = [route['result'] for route in routes]
+        for route, result, color in zip(routes, results, route_colors):
+            f.write(_ROUTE_CARD_TMPL.format_map({
+                'color': color,
+                'name': route['name'],
+                'distance_m_int': result['distance_m_int'],
+                'time_minutes': result['time_minutes'],
+                'pois_along_route': result['pois_along_route']
+            }))
+            f.write("".join(_POI_CATEGORY_TMPL.format_map({'category': category, 'count': count})
+                            for category, count in result['poi_categories'].items()))
+            f.write(_ROUTE_CARD_END)
+
+        f.write(_HTML_SCRIPT)
+        # Only the fields the map script reads; the full results go to the JSON file
+        _write_json_array(f, ({'coordinates': result['coordinates'],
+                               'distance_m_int': result['distance_m_int'],
+                               'time_minutes': result['time_minutes']} for result in results))
+        f.write(""";
+        var routeNames = """)
+        _write_json_array(f, (r['name'] for r in routes))
+        f.write(""";
+        var routeColors = """)
+        _write_json_array(f, route_colors)
+        f.write(_HTML_FOOTER)
     
+    _install_routes_viz(output_file)
     print(f"HTML visualization saved to {output_file}")
 
-def generate_timed_routes(osm_file: str, target_time_minutes: int = 120):
-    """Generate multiple route examples with specified target time"""
+# Route scenarios generated by generate_timed_routes: (heading, route name, POI preferences)
+ROUTE_SCENARIOS = [
+    # 1. Restaurant-focused route
+    ('RESTAURANT ROUTE', 'Restaurant Route', {
+        'restaurants': 25.0,   # Significantly increased to maximize route time
+        'cafes': 15.0,         # Increased to find more cafes
+        'bars_pubs': 8.0,      # Added to include nightlife options
+        'fast_food': 5.0       # Added for more food variety
+    }),
+    # 2. Tourism & Culture route
+    ('TOURISM & CULTURE ROUTE', 'Tourism Route', {
+        'tourism': 25.0,       # Significantly increased to maximize route time
+        'education': 15.0,     # Increased for cultural sites
+        'restaurants': 8.0,    # Increased for meal stops
+        'cafes': 5.0,          # Added for cultural café visits 
+        'viewpoints': 10.0,    # Added for scenic cultural sites
+        'nature': 3.0          # Added for parks and cultural gardens
+    }),
+    # 3. Shopping route
+    ('SHOPPING ROUTE', 'Shopping Route', {
+        'shops': 25.0,         # Significantly increased to maximize route time
+        'restaurants': 12.0,   # Increased for shopping breaks
+        'cafes': 8.0,          # Increased for coffee breaks while shopping
+        'bars_pubs': 5.0,      # Added for after-shopping drinks
+        'tourism': 3.0,        # Added for shopping areas near attractions
+        'transport': 2.0       # Added for public transport convenience
+    }),
+    # 4. Nightlife route
+    ('NIGHTLIFE ROUTE', 'Nightlife Route', {
+        'bars_pubs': 30.0,     # Significantly increased to maximize route time
+        'restaurants': 15.0,   # Increased for dinner options
+        'fast_food': 8.0,      # Increased for late-night eats
+        'cafes': 5.0,          # Added for pre-nightlife coffee
+        'tourism': 3.0,        # Added for nightlife near attractions
+        'shops': 2.0           # Added for areas with mixed nightlife/shopping
+    }),
+    # 5. Nature & Recreation route
+    ('NATURE & RECREATION ROUTE', 'Nature Route', {
+        'viewpoints': 30.0,   # EXTREMELY high priority for viewpoints and peaks - 3x increase!
+        'nature': 8.0,        # Significantly increased nature priority
+        'recreation': 4.0,    # Increased recreation priority  
+        'tourism': 1.0        # Reduced tourism priority
+    })
+]
+
+_scenario_engine = None  # Engine of a generate_timed_routes worker process
+
+def _init_scenario_worker(osm_file: str):
+    """Load the routing engine once per worker process"""
+    global _scenario_engine
+    _scenario_engine = POIRoutingEngine(osm_file)
+
+def _run_scenario(start: Tuple[float, float], end: Tuple[float, float], poi_preferences: Dict[str, float],
+                  target_time_minutes: int, generated_at: str, engine: Optional[POIRoutingEngine] = None) -> Dict:
+    """Route one ROUTE_SCENARIOS entry, on the worker's engine unless one is given"""
+    engine = engine or _scenario_engine
+    engine.generated_at = generated_at
+    return engine.find_route(
+        start_lat=start[0], start_lng=start[1],
+        end_lat=end[0], end_lng=end[1],
+        poi_preferences=poi_preferences,
+        target_time_minutes=target_time_minutes
+    )
+
+def generate_timed_routes(osm_file: str, target_time_minutes: int = 120, workers: Optional[int] = None,
+                          threads: Optional[int] = None):
+    """
+    Generate multiple route examples with specified target time
+    By default the scenarios run one after another on a single engine. threads > 1
+    runs them in a thread pool on that engine (SciPy's Dijkstra releases the GIL);
+    workers > 1 runs them in worker processes that each load their own engine.
+    """
     print(f"Target walking time: {target_time_minutes} minutes ({target_time_minutes/60:.1f} hours)")
     
-    # Initialize engine
-    engine = POIRoutingEngine(osm_file)
+    # One timestamp for the whole batch: result metadata and output file names
+    now = datetime.now()
+    now_iso = now.isoformat()
+    now_stamp = now.strftime('%Y%m%d_%H%M%S')
     
     # Define common start and end points for fair comparison (Swedish coordinates)
     start_lat, start_lng = 57.685, 11.920   # Southwest area
@@ -1472,122 +1852,57 @@ def generate_timed_routes(osm_file: str, target_time_minutes: int = 120):
     # Define multiple route scenarios
     routes = []
     
-    # 1. Restaurant-focused route
-    print("\\n" + "="*60)
-    print("RESTAURANT ROUTE")
-    print("="*60)
-    
-    restaurant_route = engine.find_route(
-        start_lat=start_lat, start_lng=start_lng,
-        end_lat=end_lat, end_lng=end_lng,
-        poi_preferences={
-            'restaurants': 25.0,   # Significantly increased to maximize route time
-            'cafes': 15.0,         # Increased to find more cafes
-            'bars_pubs': 8.0,      # Added to include nightlife options
-            'fast_food': 5.0       # Added for more food variety
-        },
-        target_time_minutes=target_time_minutes
-    )
-    routes.append({'name': 'Restaurant Route', 'result': restaurant_route})
-    print_route_summary(restaurant_route, "Restaurant Route")
-    
-    # 2. Tourism & Culture route
-    print("\\n" + "="*60)
-    print("TOURISM & CULTURE ROUTE")
-    print("="*60)
-    
-    tourism_route = engine.find_route(
-        start_lat=start_lat, start_lng=start_lng,
-        end_lat=end_lat, end_lng=end_lng,
-        poi_preferences={
-            'tourism': 25.0,       # Significantly increased to maximize route time
-            'education': 15.0,     # Increased for cultural sites
-            'restaurants': 8.0,    # Increased for meal stops
-            'cafes': 5.0,          # Added for cultural café visits 
-            'viewpoints': 10.0,    # Added for scenic cultural sites
-            'nature': 3.0          # Added for parks and cultural gardens
-        },
-        target_time_minutes=target_time_minutes
-    )
-    routes.append({'name': 'Tourism Route', 'result': tourism_route})
-    print_route_summary(tourism_route, "Tourism Route")
-    
-    # 3. Shopping route
-    print("\\n" + "="*60)
-    print("SHOPPING ROUTE")
-    print("="*60)
+    # The scenarios are independent. Worker processes are opt-in only: each one
+    # loads and indexes the whole dump, and the direct routes are no longer shared.
+    start, end = (start_lat, start_lng), (end_lat, end_lng)
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ROUTE_SCENARIOS)),
+                                 initializer=_init_scenario_worker, initargs=(osm_file,)) as executor:
+            futures = [executor.submit(_run_scenario, start, end, poi_preferences, target_time_minutes, now_iso)
+                       for _, _, poi_preferences in ROUTE_SCENARIOS]
+            results = [future.result() for future in futures]
+    else:
+        engine = POIRoutingEngine(osm_file)
+        if threads and threads > 1:
+            # find_route reweights the engine in place, so each scenario gets its own view
+            with ThreadPoolExecutor(max_workers=min(threads, len(ROUTE_SCENARIOS))) as executor:
+                futures = [executor.submit(_run_scenario, start, end, poi_preferences, target_time_minutes,
+                                           now_iso, engine._routing_view())
+                           for _, _, poi_preferences in ROUTE_SCENARIOS]
+                results = [future.result() for future in futures]
+        else:
+            results = [_run_scenario(start, end, poi_preferences, target_time_minutes, now_iso, engine)
+                       for _, _, poi_preferences in ROUTE_SCENARIOS]
     
-    shopping_route = engine.find_route(
-        start_lat=start_lat, start_lng=start_lng,
-        end_lat=end_lat, end_lng=end_lng,
-        poi_preferences={
-            'shops': 25.0,         # Significantly increased to maximize route time
-            'restaurants': 12.0,   # Increased for shopping breaks
-            'cafes': 8.0,          # Increased for coffee breaks while shopping
-            'bars_pubs': 5.0,      # Added for after-shopping drinks
-            'tourism': 3.0,        # Added for shopping areas near attractions
-            'transport': 2.0       # Added for public transport convenience
-        },
-        target_time_minutes=target_time_minutes
-    )
-    routes.append({'name': 'Shopping Route', 'result': shopping_route})
-    print_route_summary(shopping_route, "Shopping Route")
-    
-    # 4. Nightlife route
-    print("\\n" + "="*60)
-    print("NIGHTLIFE ROUTE")
-    print("="*60)
-    
-    nightlife_route = engine.find_route(
-        start_lat=start_lat, start_lng=start_lng,
-        end_lat=end_lat, end_lng=end_lng,
-        poi_preferences={
-            'bars_pubs': 30.0,     # Significantly increased to maximize route time
-            'restaurants': 15.0,   # Increased for dinner options
-            'fast_food': 8.0,      # Increased for late-night eats
-            'cafes': 5.0,          # Added for pre-nightlife coffee
-            'tourism': 3.0,        # Added for nightlife near attractions
-            'shops': 2.0           # Added for areas with mixed nightlife/shopping
-        },
-        target_time_minutes=target_time_minutes
-    )
-    routes.append({'name': 'Nightlife Route', 'result': nightlife_route})
-    print_route_summary(nightlife_route, "Nightlife Route")
-    
-    # 5. Nature & Recreation route
-    print("\\n" + "="*60)
-    print("NATURE & RECREATION ROUTE")
-    print("="*60)
-    
-    nature_route = engine.find_route(
-        start_lat=start_lat, start_lng=start_lng,
-        end_lat=end_lat, end_lng=end_lng,
-        poi_preferences={
-            'viewpoints': 30.0,   # EXTREMELY high priority for viewpoints and peaks - 3x increase!
-            'nature': 8.0,        # Significantly increased nature priority
-            'recreation': 4.0,    # Increased recreation priority  
-            'tourism': 1.0        # Reduced tourism priority
-        },
-        target_time_minutes=target_time_minutes
-    )
-    routes.append({'name': 'Nature Route', 'result': nature_route})
-    print_route_summary(nature_route, "Nature Route")
+    for (heading, name, _), result in zip(ROUTE_SCENARIOS, results):
+        print("\\n" + "="*60)
+        print(heading)
+        print("="*60)
+        
+        routes.append({'name': name, 'result': result})
+        print_route_summary(result, name)
     
     # Generate HTML visualization
-    html_filename = f"timed_routes_{target_time_minutes}min_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+    html_filename = f"timed_routes_{target_time_minutes}min_{now_stamp}.html"
     generate_html_visualization(routes, html_filename)
     
     # Save all routes to JSON
-    all_routes_filename = f"timed_routes_{target_time_minutes}min_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(all_routes_filename, 'w', encoding='utf-8') as f:
-        json.dump({
-            'metadata': {
-                'generated_at': datetime.now().isoformat(),
-                'target_time_minutes': target_time_minutes,
-                'total_routes': len(routes)
-            },
-            'routes': routes
-        }, f, indent=2, ensure_ascii=False)
+    all_routes_filename = f"timed_routes_{target_time_minutes}min_{now_stamp}.json"
+    all_routes = {
+        'metadata': {
+            'generated_at': now_iso,
+            'target_time_minutes': target_time_minutes,
+            'total_routes': len(routes)
+        },
+        'routes': routes
+    }
+    if orjson is not None:
+        with open(all_routes_filename, 'wb') as f:
+            f.write(orjson.dumps(all_routes, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS |
+                                 orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(all_routes_filename, 'w', encoding='utf-8') as f:
+            json.dump(all_routes, f, indent=2, ensure_ascii=False)
     
     print(f"\\nAll routes saved to {all_routes_filename}")
     return routes
@@ -1612,12 +1927,13 @@ def print_route_summary(result: Dict, route_name: str):
         print(f"Error in {route_name}: {result['error']}")
         return
     
-    print(f"Distance: {result['distance_meters']:.0f}m")
+    print(f"Distance: {result['distance_m_int']}m")
     print(f"Time: {result['time_minutes']:.1f} minutes")
     print(f"POIs along route: {result['pois_along_route']}")
     
-    if result['poi_categories']:
-        print("Categories:", ", ".join([f"{cat}({count})" for cat, count in result['poi_categories'].items()]))
+    categories = result['poi_categories']
+    if categories:
+        print("Categories:", ", ".join([f"{cat}({count})" for cat, count in categories.items()]))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,77 @@
+// Map script for the pages written by generate_html_visualization in
+// poi_routing_engine.py. Each page defines routes, routeNames and routeColors
+// inline before loading this file.
+
+// Initialize map
+var map = L.map('map');
+
+// Add OpenStreetMap tiles
+L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+    attribution: '© OpenStreetMap contributors'
+}).addTo(map);
+
+var allBounds = [];
+
+// Add routes to map
+routes.forEach(function(route, index) {
+    var color = routeColors[index];
+    var name = routeNames[index];
+
+    if (route.coordinates && route.coordinates.length > 0) {
+        var latlngs = route.coordinates;  // Already [lat, lng] pairs
+
+        // Add route line
+        var polyline = L.polyline(latlngs, {
+            color: color,
+            weight: 4,
+            opacity: 0.8
+        }).addTo(map);
+
+        polyline.bindPopup('<b>' + name + '</b><br>' +
+                         'Distance: ' + route.distance_m_int + 'm<br>' +
+                         'Time: ' + route.time_minutes.toFixed(1) + ' min');
+
+        // Add start marker
+        if (latlngs.length > 0) {
+            L.circleMarker(latlngs[0], {
+                color: color,
+                fillColor: color,
+                fillOpacity: 0.8,
+                radius: 8
+            }).addTo(map).bindPopup('Start: ' + name);
+        }
+
+        // Add end marker
+        if (latlngs.length > 1) {
+            L.circleMarker(latlngs[latlngs.length - 1], {
+                color: color,
+                fillColor: 'white',
+                fillOpacity: 0.8,
+                radius: 6
+            }).addTo(map).bindPopup('End: ' + name);
+        }
+
+        // Collect bounds
+        latlngs.forEach(latlng => allBounds.push(latlng));
+    }
+});
+
+// Fit map to show all routes
+if (allBounds.length > 0) {
+    map.fitBounds(allBounds, {padding: [20, 20]});
+}
+
+// Add legend
+var legend = L.control({position: 'topright'});
+legend.onAdd = function(map) {
+    var div = L.DomUtil.create('div', 'legend');
+    div.innerHTML = '<h4>Routes</h4>';
+
+    routeNames.forEach(function(name, index) {
+        var color = routeColors[index];
+        div.innerHTML += '<div><span style="color: ' + color + '; font-weight: bold;">■</span> ' + name + '</div>';
+    });
+
+    return div;
+};
+legend.addTo(map);
@@ -19,9 +19,11 @@ def create_route_map(route_file):
         print("Error: No coordinates found in route data")
         return None
     
-    coordinates = route_data['coordinates']
-    center_lat = sum(coord['lat'] for coord in coordinates) / len(coordinates)
-    center_lng = sum(coord['lng'] for coord in coordinates) / len(coordinates)
+    # Routes are [lat, lng] pairs; older route files used {'lat': ..., 'lng': ...} dicts
+    coordinates = [[coord['lat'], coord['lng']] if isinstance(coord, dict) else coord
+                   for coord in route_data['coordinates']]
+    center_lat = sum(coord[0] for coord in coordinates) / len(coordinates)
+    center_lng = sum(coord[1] for coord in coordinates) / len(coordinates)
     
     # POI category colors
     poi_colors = {
@@ -148,7 +150,7 @@ def create_route_map(route_file):
         }}).addTo(map);
         
         // Route coordinates
-        var routeCoords = {json.dumps([[coord['lat'], coord['lng']] for coord in coordinates])};
+        var routeCoords = {json.dumps(coordinates)};
         
         // Draw route
         var routeLine = L.polyline(routeCoords, {{